@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
     Box, 
     Button, 
@@ -26,7 +26,9 @@ import {
     Accordion,
     AccordionSummary,
     AccordionDetails,
-    Tooltip
+    Tooltip,
+    Switch,
+    FormControlLabel
 } from '@mui/material';
 import CloudUploadIcon from '@mui/icons-material/CloudUpload';
 import DownloadIcon from '@mui/icons-material/Download';
@@ -40,6 +42,9 @@ import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 import VisibilityIcon from '@mui/icons-material/Visibility';
 import { styled, alpha } from '@mui/material/styles';
 
+// 待验证数据支持的扩展名
+const VALIDATION_EXTENSIONS = ['.csv', '.pkl', '.joblib', '.arrow', '.feather'];
+
 const Input = styled('input')({
     display: 'none',
 });
@@ -125,9 +130,17 @@ const FileUpload = () => {
     const [snackbarMessage, setSnackbarMessage] = useState('');
     const [snackbarSeverity, setSnackbarSeverity] = useState('info');
     const [resultData, setResultData] = useState([]);
+    const [resultTotal, setResultTotal] = useState(0);
+    const [verdictCounts, setVerdictCounts] = useState({});
+    const [verdictFilter, setVerdictFilter] = useState(null);
     const [page, setPage] = useState(0);
-    const [rowsPerPage, setRowsPerPage] = useState(10);
+    const [rowsPerPage, setRowsPerPage] = useState(12);
     const [loading, setLoading] = useState(false);
+    const [jobId, setJobId] = useState(null);
+    const [quickLook, setQuickLook] = useState(false);
+    const [provisional, setProvisional] = useState(false);
+    // WebSocket回调中需要读取当前任务ID
+    const jobIdRef = useRef(null);
 
     useEffect(() => {
         let websocket = null;
@@ -151,6 +164,12 @@ const FileUpload = () => {
                     const data = JSON.parse(event.data);
                     if (data.type === 'progress') {
                         setProgress(data.progress);
+                    } else if (data.type === 'provisional' && data.jobId === jobIdRef.current) {
+                        // 基于样本的初步结果，精确复核完成后会被替换
+                        setResultFile(data.resultFile);
+                        setProvisional(true);
+                        setPage(0);
+                        showSnackbar('已生成基于样本的初步结果，正在用全量数据复核', 'info');
                     } else if (data.type === 'error') {
                         setError(data.message);
                         showSnackbar(data.message, 'error');
@@ -221,13 +240,13 @@ const FileUpload = () => {
 
     const handleValidationFileChange = (event) => {
         const file = event.target.files[0];
-        if (file && (file.name.endsWith('.csv') || file.name.endsWith('.pkl'))) {
+        if (file && VALIDATION_EXTENSIONS.some((ext) => file.name.endsWith(ext))) {
             setValidationFile(file);
             setError(null);
             showSnackbar(`已选择待验证数据: ${file.name}`, 'success');
         } else {
-            setError('待验证数据必须是CSV或PKL文件');
-            showSnackbar('待验证数据必须是CSV或PKL文件', 'error');
+            setError('待验证数据必须是CSV、PKL、Joblib或Arrow文件');
+            showSnackbar('待验证数据必须是CSV、PKL、Joblib或Arrow文件', 'error');
         }
     };
 
@@ -247,15 +266,27 @@ const FileUpload = () => {
         setUploading(true);
         setProgress(0);
         setError(null);
+        setResultFile(null);
         setResultData([]);  // 清空之前的结果
+        setResultTotal(0);
+        setVerdictCounts({});
+        setVerdictFilter(null);
+        setPage(0);
+        setProvisional(false);
         showSnackbar('开始上传数据...', 'info');
 
         const formData = new FormData();
         formData.append('standard', standardFile);
         formData.append('validation', validationFile);
 
+        // 任务ID用于取消正在进行的验证
+        const newJobId = `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
+        setJobId(newJobId);
+        jobIdRef.current = newJobId;
+
         try {
-            const response = await fetch('http://localhost:3001/api/upload', {
+            const quickLookParam = quickLook ? '&quickLook=1' : '';
+            const response = await fetch(`http://localhost:3001/api/upload?jobId=${newJobId}${quickLookParam}`, {
                 method: 'POST',
                 body: formData,
             });
@@ -263,11 +294,10 @@ const FileUpload = () => {
             const data = await response.json();
 
             if (response.ok) {
+                // 设置结果文件后由useEffect按页加载结果数据
                 setResultFile(data.resultFile);
+                setProvisional(false);
                 showSnackbar('数据验证完成，正在获取结果', 'success');
-                
-                // 加载结果数据
-                fetchResultData(data.resultFile);
             } else {
                 setError(data.error + (data.details ? `\n${data.details}` : ''));
                 showSnackbar('上传失败: ' + data.error, 'error');
@@ -278,18 +308,46 @@ const FileUpload = () => {
             console.error('Upload error:', err);
         } finally {
             setUploading(false);
+            setJobId(null);
+            jobIdRef.current = null;
         }
     };
 
-    const fetchResultData = async (filename) => {
+    const handleCancel = async () => {
+        if (!jobId) {
+            return;
+        }
+        try {
+            const response = await fetch(`http://localhost:3001/api/cancel/${jobId}`, { method: 'POST' });
+            if (!response.ok) {
+                // 404: 上传尚未完成、处理进程还未启动，或任务已经结束
+                const data = await response.json().catch(() => ({}));
+                showSnackbar('取消失败: ' + (data.error || `HTTP ${response.status}`), 'error');
+                return;
+            }
+            showSnackbar('已取消验证任务', 'info');
+        } catch (err) {
+            showSnackbar('取消失败: ' + err.message, 'error');
+        }
+    };
+
+    const fetchResultData = async (filename, pageIndex, pageSize, verdict) => {
         try {
             setLoading(true);
-            const response = await fetch(`http://localhost:3001/api/result/${filename}`);
+            const params = new URLSearchParams({ page: pageIndex, pageSize });
+            if (verdict) {
+                params.set('verdict', verdict);
+            }
+            const response = await fetch(`http://localhost:3001/api/result/${filename}?${params}`);
             
             if (response.ok) {
                 const data = await response.json();
-                setResultData(data);
-                showSnackbar(`成功获取 ${data.length} 条结果数据`, 'success');
+                setResultData(data.rows);
+                setResultTotal(data.total);
+                setVerdictCounts(data.verdicts);
+                if (pageIndex === 0 && !verdict) {
+                    showSnackbar(`成功获取 ${data.total} 条结果数据`, 'success');
+                }
             } else {
                 showSnackbar('获取结果数据失败', 'error');
             }
@@ -301,6 +359,17 @@ const FileUpload = () => {
         }
     };
 
+    useEffect(() => {
+        if (resultFile) {
+            fetchResultData(resultFile, page, rowsPerPage, verdictFilter);
+        }
+    }, [resultFile, page, rowsPerPage, verdictFilter]);
+
+    const handleVerdictFilter = (verdict) => {
+        setVerdictFilter(verdictFilter === verdict ? null : verdict);
+        setPage(0);
+    };
+
     const handleDownload = () => {
         if (resultFile) {
             window.open(`http://localhost:3001/api/download/${resultFile}`, '_blank');
@@ -391,7 +460,7 @@ const FileUpload = () => {
                                         <Box sx={{ mt: 2 }}>
                                             <label htmlFor="validation-file">
                                                 <Input
-                                                    accept=".csv,.pkl"
+                                                    accept={VALIDATION_EXTENSIONS.join(',')}
                                                     id="validation-file"
                                                     type="file"
                                                     onChange={handleValidationFileChange}
@@ -436,6 +505,19 @@ const FileUpload = () => {
                                         </Typography>
                                         
                                         <Box sx={{ mt: 2 }}>
+                                            <Tooltip title="先基于随机样本给出初步结论，全量数据处理完成后自动更新">
+                                                <FormControlLabel
+                                                    control={
+                                                        <Switch
+                                                            checked={quickLook}
+                                                            onChange={(event) => setQuickLook(event.target.checked)}
+                                                            disabled={uploading}
+                                                        />
+                                                    }
+                                                    label="快速预览"
+                                                    sx={{ mb: 1 }}
+                                                />
+                                            </Tooltip>
                                             <StyledButton
                                                 variant="contained"
                                                 color="primary"
@@ -467,6 +549,18 @@ const FileUpload = () => {
                                                     {Math.round(progress)}%
                                                 </Typography>
                                             </Box>
+                                            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 1 }}>
+                                                <Button
+                                                    variant="outlined"
+                                                    color="error"
+                                                    size="small"
+                                                    startIcon={<CloseIcon />}
+                                                    onClick={handleCancel}
+                                                    disabled={!jobId}
+                                                >
+                                                    取消验证
+                                                </Button>
+                                            </Box>
                                         </CardContent>
                                     </Card>
                                 </Fade>
@@ -506,9 +600,15 @@ const FileUpload = () => {
                                     <Card variant="outlined" sx={{ borderRadius: 2, mb: 2, bgcolor: alpha('#4caf50', 0.05) }}>
                                         <CardContent>
                                             <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 2 }}>
-                                                <Typography variant="subtitle1" color="success.main" sx={{ display: 'flex', alignItems: 'center' }}>
-                                                    <CheckCircleIcon sx={{ mr: 1 }} /> 输出完成
-                                                </Typography>
+                                                {provisional ? (
+                                                    <Typography variant="subtitle1" color="info.main" sx={{ display: 'flex', alignItems: 'center' }}>
+                                                        <VisibilityIcon sx={{ mr: 1 }} /> 初步结果（基于样本，复核中）
+                                                    </Typography>
+                                                ) : (
+                                                    <Typography variant="subtitle1" color="success.main" sx={{ display: 'flex', alignItems: 'center' }}>
+                                                        <CheckCircleIcon sx={{ mr: 1 }} /> 输出完成
+                                                    </Typography>
+                                                )}
                                                 <DownloadButton
                                                     variant="contained"
                                                     color="success"
@@ -525,15 +625,27 @@ const FileUpload = () => {
                             </Grid>
                         )}
 
-                        {resultData.length > 0 && (
+                        {Object.keys(verdictCounts).length > 0 && (
                             <Grid item xs={12}>
-                                <Grow in={resultData.length > 0} timeout={700}>
+                                <Grow in={Object.keys(verdictCounts).length > 0} timeout={700}>
                                     <Box>
                                         <Typography variant="h6" color="#1976d2" sx={{ mb: 2, display: 'flex', alignItems: 'center' }}>
                                             <FavoriteIcon sx={{ mr: 1, color: '#1976d2' }} /> 验证结果
+                                            {loading && <CircularProgress size={20} sx={{ ml: 2 }} />}
                                         </Typography>
+                                        <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 1, mb: 2 }}>
+                                            {Object.entries(verdictCounts).map(([verdict, count]) => (
+                                                <StatusChip
+                                                    key={verdict}
+                                                    label={`${verdict} (${count})`}
+                                                    color={verdict.includes('不') ? 'error' : 'success'}
+                                                    variant={verdictFilter === verdict ? 'filled' : 'outlined'}
+                                                    onClick={() => handleVerdictFilter(verdict)}
+                                                />
+                                            ))}
+                                        </Box>
                                         <Grid container spacing={2}>
-                                            {resultData.slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage).map((row, idx) => (
+                                            {resultData.map((row, idx) => (
                                                 <Grid item xs={12} md={6} lg={4} key={idx}>
                                                     <Card sx={{
                                                         borderLeft: `6px solid ${row.判断结果.includes('不') ? '#f44336' : '#43a047'}`,
@@ -563,6 +675,16 @@ const FileUpload = () => {
                                                                 variant="outlined"
                                                                 sx={{ mb: 1 }}
                                                             />
+                                                            {row.初步判断结果 && row.初步判断结果 !== row.判断结果 && (
+                                                                <Tooltip title={`初步结果: ${row.初步判断结果}`}>
+                                                                    <StatusChip
+                                                                        label="结论已更新"
+                                                                        color="warning"
+                                                                        size="small"
+                                                                        sx={{ mb: 1, ml: 1 }}
+                                                                    />
+                                                                </Tooltip>
+                                                            )}
                                                             <Accordion sx={{ bgcolor: 'transparent', boxShadow: 'none' }}>
                                                                 <AccordionSummary expandIcon={<ExpandMoreIcon />} sx={{ p: 0, minHeight: 'auto' }}>
                                                                     <Typography variant="body2" color="#1976d2">详情</Typography>
@@ -590,6 +712,16 @@ const FileUpload = () => {
                                                 </Grid>
                                             ))}
                                         </Grid>
+                                        <TablePagination
+                                            component="div"
+                                            count={resultTotal}
+                                            page={page}
+                                            onPageChange={handleChangePage}
+                                            rowsPerPage={rowsPerPage}
+                                            onRowsPerPageChange={handleChangeRowsPerPage}
+                                            rowsPerPageOptions={[12, 24, 48]}
+                                            labelRowsPerPage="每页条数"
+                                        />
                                     </Box>
                                 </Grow>
                             </Grid>
@@ -7,6 +7,7 @@ const cors = require('cors');
 const WebSocket = require('ws');
 const http = require('http');
 const csv = require('csv-parser');
+const { createResultHandler } = require('./resultStore');
 
 const app = express();
 const port = 3001;
@@ -157,30 +158,8 @@ app.get('/api/download/:filename', (req, res) => {
     }
 });
 
-// 获取结果数据的API端点
-app.get('/api/result/:filename', (req, res) => {
-    const filename = req.params.filename;
-    const filePath = path.join(__dirname, 'results', filename);
-    
-    if (fs.existsSync(filePath)) {
-        const results = [];
-        
-        fs.createReadStream(filePath)
-            .pipe(csv())
-            .on('data', (data) => {
-                results.push(data);
-            })
-            .on('end', () => {
-                res.json(results);
-            })
-            .on('error', (err) => {
-                console.error('读取结果文件出错:', err);
-                res.status(500).json({ success: false, error: '读取结果文件出错' });
-            });
-    } else {
-        res.status(404).json({ success: false, error: '文件不存在' });
-    }
-});
+// 获取结果数据的API端点（分页、按判断结果过滤、支持ETag）
+app.get('/api/result/:filename', createResultHandler(resultsDir));
 
 // 启动服务器
 server.listen(port, () => {
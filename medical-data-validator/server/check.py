@@ -1,9 +1,17 @@
 import pandas as pd
+import numpy as np
 import ast
 import re
 import json
+import time
 from datetime import datetime
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
+
+from profiles import ColumnProfile, make_range
+from labvalues import parse_lab_values, looks_like_lab_values, lab_value_summary
+from keys import analyze_keys, is_key_column
+from incremental import ColumnFacts
+from profiling import PeakMemorySampler
 
 """
 # DataFrameChecker 输出格式说明
@@ -13,7 +21,8 @@ from typing import Dict, List, Union
 
 ## 'info'列的格式说明
 
-'info'列存储的是一个字典，包含以下结构：
+'info'列存储的是profiles.ColumnProfile（按data_type划分的__slots__数据类），
+调用其to_dict()得到如下结构的字典：
 
 ```
 {
@@ -36,7 +45,18 @@ from typing import Dict, List, Union
        "min": <最小值>,
        "max": <最大值>,
        "mean": <平均值>,
-       "median": <中位数>
+       "median": <中位数>,
+       "std": <标准差>,
+       "quantiles": {"p1": ..., "p5": ..., "p25": ..., "p50": ..., "p75": ..., "p95": ..., "p99": ...},
+       "histogram": {"bin_edges": [...], "counts": [...]},  // 等宽直方图
+       "top_values": [[<取值>, <出现次数>], ...],  // 出现频率最高的k个取值，没有重复取值的连续型列省略
+       "outliers": {
+         "lower_fence": <下界 Q1-1.5*IQR>,
+         "upper_fence": <上界 Q3+1.5*IQR>,
+         "count": <离群值数量>,
+         "low_samples": [...],  // 最小的k个离群值
+         "high_samples": [...]  // 最大的k个离群值
+       }
      }
    }
    ```
@@ -51,7 +71,18 @@ from typing import Dict, List, Union
        "min": <最小值>,
        "max": <最大值>,
        "mean": <平均值>,
-       "median": <中位数>
+       "median": <中位数>,
+       "std": <标准差>,
+       "quantiles": {"p1": ..., "p5": ..., "p25": ..., "p50": ..., "p75": ..., "p95": ..., "p99": ...},
+       "histogram": {"bin_edges": [...], "counts": [...]},  // 等宽直方图
+       "top_values": [[<取值>, <出现次数>], ...],  // 出现频率最高的k个取值，没有重复取值的连续型列省略
+       "outliers": {
+         "lower_fence": <下界 Q1-1.5*IQR>,
+         "upper_fence": <上界 Q3+1.5*IQR>,
+         "count": <离群值数量>,
+         "low_samples": [...],  // 最小的k个离群值
+         "high_samples": [...]  // 最大的k个离群值
+       }
      }
    }
    ```
@@ -148,7 +179,24 @@ from typing import Dict, List, Union
    }
    ```
 
-10. **unknown** - 未知类型（列全为空值）
+10. **lab_value** - 检验结果类型（数值为主，混有 `<0.5`、`>1000` 等截断值或 `阴性`、`+++` 等定性结果）
+    ```
+    {
+      "data_type": "lab_value",
+      "value_range": {
+        "null_count": <空值数量>,
+        "null_percentage": <空值百分比>,
+        ...,  // 与float相同的数值统计，只在数值部分上计算（截断值取其界限值）
+        "numeric_count": <含数值的单元格数>,
+        "qualitative_count": <定性结果单元格数>,
+        "censored_count": <带比较符的单元格数>,
+        "comparators": {"<": <次数>, ">": <次数>, ...},
+        "qualitative_values": [[<定性结果>, <出现次数>], ...]  // 按次数降序
+      }
+    }
+    ```
+
+11. **unknown** - 未知类型（列全为空值）
     ```
     {
       "data_type": "unknown",
@@ -157,23 +205,263 @@ from typing import Dict, List, Union
       }
     }
     ```
+
+## 标识列
+
+列名形如 patient_id、visit_no、住院号、患者编号 的非空列，value_range 另有基于64位哈希的键分析（见keys.py）：
+```
+"key": {
+  "distinct_count": <不同键数>,
+  "uniqueness": <不同键数/非空行数>,
+  "duplicate_rows": <重复出现的行数（不含首次出现）>,
+  "duplicated_keys": <出现多次的键数>,
+  "max_multiplicity": <单个键最多出现次数>,
+  "duplicate_samples": [[<键值>, <出现次数>], ...]
+}
+```
 """
 
 
+def _single_value_histogram(value, n: int, bins: int):
+    """所有取值相同时的直方图：与np.histogram一致，区间扩展为 ±0.5，全部落在中间的桶"""
+    counts = np.zeros(bins, dtype=np.int64)
+    counts[bins // 2] = n
+    return counts, np.linspace(float(value) - 0.5, float(value) + 0.5, bins + 1)
+
+
+class _CountedValues:
+    """跨度不大的整数列：所有统计量都从bincount频数表读出"""
+
+    def __init__(self, values: np.ndarray, v_min):
+        self.v_min = int(v_min)
+        self.n = values.size
+        self.freq = np.bincount(values - self.v_min if self.v_min else values)
+        self.cum = np.cumsum(self.freq)
+        self.grid = np.arange(self.freq.size, dtype=np.float64)
+
+    def order_statistics(self, ranks: np.ndarray, quartile_ranks=None) -> List[float]:
+        """升序第ranks个值（从0开始）；quartile_ranks仅_BinnedValues使用"""
+        return (self.v_min + np.searchsorted(self.cum, ranks, side='right')).tolist()
+
+    def moments(self):
+        offset = np.dot(self.freq, self.grid) / self.n
+        variance = np.dot(self.freq, np.square(self.grid - offset)) / self.n
+        return self.v_min + offset, np.sqrt(variance)
+
+    def histogram(self, bins: int):
+        if self.freq.size == 1:
+            return _single_value_histogram(self.v_min, self.n, bins)
+        return np.histogram(self.v_min + self.grid, bins=bins,
+                            range=(float(self.v_min), float(self.v_min + self.freq.size - 1)), weights=self.freq)
+
+    def top_values(self, top_k: int):
+        k = min(top_k, self.freq.size)
+        idx = np.argpartition(self.freq, self.freq.size - k)[-k:]
+        idx = idx[np.argsort(-self.freq[idx], kind='stable')]
+        return [(self.v_min + i, self.freq[i]) for i in idx.tolist() if self.freq[i] > 0]
+
+    def outliers(self, lower_fence: float, upper_fence: float, top_k: int):
+        """(离群值数量, 最小的top_k个, 最大的top_k个)，含重复值"""
+        size = self.freq.size
+        # 偏移 < low_end 的取值低于下界，偏移 >= high_start 的取值高于上界
+        low_end = int(np.clip(np.ceil(lower_fence - self.v_min), 0, size))
+        high_start = int(np.clip(np.floor(upper_fence - self.v_min) + 1, 0, size))
+        low_count = int(self.cum[low_end - 1]) if low_end else 0
+        high_count = self.n - (int(self.cum[high_start - 1]) if high_start else 0)
+
+        low_idx = np.flatnonzero(self.freq[:low_end])[:top_k]
+        high_idx = high_start + np.flatnonzero(self.freq[high_start:])[-top_k:]
+        low = np.repeat(low_idx, np.minimum(self.freq[low_idx], top_k))[:top_k] + self.v_min
+        high = np.repeat(high_idx, np.minimum(self.freq[high_idx], top_k))[-top_k:] + self.v_min
+        return low_count + high_count, low.tolist(), high.tolist()
+
+
+class _BinnedValues:
+    """
+    浮点列和跨度大的整数列：在细分的等宽桶上计数，
+    分位数和离群值只需取出少数几个桶中的原值排序
+    """
+
+    # 高频值候选的样本量
+    SAMPLE_SIZE = 10000
+    # 分块计算桶号，中间数组留在缓存中，也不必为整列桶号分配内存
+    CHUNK_ROWS = 1 << 16
+    # 每个直方图桶细分的桶数
+    FINE_PER_BIN = 1024
+
+    def __init__(self, values: np.ndarray, v_min, v_max, bins: int):
+        self.values = values
+        self.v_min = v_min
+        self.v_max = v_max
+        self.n = values.size
+        self.bins = bins
+        fine_bins = bins * self.FINE_PER_BIN
+        # 桶号随取值单调不减，同一桶内的取值在排序后连续
+        self.scale = fine_bins / (float(v_max) - float(v_min)) if v_max > v_min else 0.0
+        # order_statistics取出的桶（升序）和其中的原值，以及围栏外的桶范围，供histogram()和outliers()复用
+        self._selected = None
+        self._picked = None
+        self._tails = None
+        self.freq = np.zeros(fine_bins, dtype=np.int64)
+        for _, bins in self._chunks():
+            self.freq += np.bincount(bins, minlength=fine_bins)
+        self.cum = np.cumsum(self.freq)
+
+    def _chunks(self):
+        """分块给出 (取值, 桶号)；桶号数组在块间复用"""
+        scaled = np.empty(min(self.CHUNK_ROWS, self.n), dtype=np.float64)
+        bins = np.empty(scaled.size, dtype=np.intp)
+        for start in range(0, self.n, self.CHUNK_ROWS):
+            chunk = self.values[start:start + self.CHUNK_ROWS]
+            size = chunk.size
+            # 按浮点相减，极端跨度的整数列不会溢出
+            np.subtract(chunk, float(self.v_min), out=scaled[:size])
+            scaled[:size] *= self.scale
+            bins[:size] = scaled[:size]
+            np.minimum(bins[:size], self.freq.size - 1, out=bins[:size])
+            yield chunk, bins[:size]
+
+    def _bin_of(self, values) -> np.ndarray:
+        """取值所在的细分桶，计算方式与全列分桶相同"""
+        bins = (np.subtract(values, float(self.v_min), dtype=np.float64) * self.scale).astype(np.intp)
+        return np.clip(bins, 0, self.freq.size - 1)
+
+    def _select(self, selected: np.ndarray) -> np.ndarray:
+        """取出选中桶中的原值，升序"""
+        flags = np.zeros(self.freq.size, dtype=bool)
+        flags[selected] = True
+        return np.sort(np.concatenate([chunk[flags[bins]] for chunk, bins in self._chunks()]))
+
+    def _edge_bins(self) -> np.ndarray:
+        """直方图各内部边界两侧的细分桶：浮点误差下其中的取值可能与np.histogram分到不同的桶"""
+        starts = np.arange(1, self.bins) * self.FINE_PER_BIN
+        return np.concatenate((starts - 1, starts)) if self.scale else np.empty(0, dtype=np.intp)
+
+    def _values_in(self, wanted: np.ndarray) -> np.ndarray:
+        """order_statistics已取出的桶中，属于wanted的原值"""
+        if wanted.size == 0:
+            return self._picked[:0]
+        starts = np.concatenate(([0], np.cumsum(self.freq[self._selected])[:-1]))
+        slot = np.searchsorted(self._selected, wanted)
+        return np.concatenate([self._picked[start:start + self.freq[bin_]]
+                               for start, bin_ in zip(starts[slot].tolist(), wanted.tolist())])
+
+    def _tail_bins(self, low_bin: int, high_bin: int) -> np.ndarray:
+        """下界所在桶及以下、上界所在桶及以上的桶"""
+        return np.concatenate((np.arange(low_bin + 1), np.arange(max(high_bin, 0), self.freq.size)))
+
+    def order_statistics(self, ranks: np.ndarray, quartile_ranks=None) -> List:
+        """
+        升序第ranks个值（从0开始）
+
+        给出Q1、Q3的秩 (Q1上取整的秩, Q3下取整的秩) 时，由其所在桶推出Tukey围栏可能的范围，
+        同一次遍历中一并取出围栏外可能有取值的桶和直方图边界两侧的桶，
+        histogram()和outliers()无需再遍历全列
+        """
+        rank_bins = np.searchsorted(self.cum, ranks, side='right')
+        selected = np.union1d(rank_bins, self._edge_bins())
+        if quartile_ranks is not None and self.scale:
+            q1_bin, q3_bin = np.searchsorted(self.cum, quartile_ranks, side='right').tolist()
+            q1_high = float(self.v_min) + (q1_bin + 1) / self.scale
+            q3_low = float(self.v_min) + q3_bin / self.scale
+            # 围栏的最大下界和最小上界，各放宽一个桶以容纳浮点误差
+            lower_fence = q1_high - 1.5 * (q3_low - q1_high)
+            upper_fence = q3_low + 1.5 * (q3_low - q1_high)
+            low_bin = min(int(self._bin_of(lower_fence)) + 1, self.freq.size - 1) if lower_fence > self.v_min else -1
+            high_bin = max(int(self._bin_of(upper_fence)) - 1, 0) if upper_fence < self.v_max else self.freq.size
+            self._tails = (low_bin, high_bin)
+            selected = np.union1d(selected, self._tail_bins(low_bin, high_bin))
+        picked = self._select(selected)
+        self._selected = selected
+        self._picked = picked
+        # 各选中桶在picked中的起点，以及桶之前的取值个数
+        starts = np.concatenate(([0], np.cumsum(self.freq[selected])[:-1]))
+        before = self.cum[selected] - self.freq[selected]
+        slot = np.searchsorted(selected, rank_bins)
+        return picked[starts[slot] + ranks - before[slot]].tolist()
+
+    def moments(self):
+        mean = self.values.mean()
+        squares = 0.0
+        for start in range(0, self.n, self.CHUNK_ROWS):
+            deviation = np.subtract(self.values[start:start + self.CHUNK_ROWS], mean, dtype=np.float64)
+            squares += np.dot(deviation, deviation)
+        return mean, np.sqrt(squares / self.n)
+
+    def histogram(self, bins: int):
+        if self.v_max == self.v_min:
+            return _single_value_histogram(self.v_min, self.n, bins)
+        # 边界与np.histogram相同（linspace，最后一个桶右闭）；边界两侧细分桶中的取值按边界重新计数
+        edges = np.linspace(float(self.v_min), float(self.v_max), bins + 1)
+        edge_bins = self._edge_bins()
+        if self._picked is None:
+            self.order_statistics(np.empty(0, dtype=np.int64))
+        inner = self.freq.copy()
+        inner[edge_bins] = 0
+        counts = inner.reshape(bins, -1).sum(axis=1)
+        counts += np.histogram(self._values_in(edge_bins), bins=edges)[0]
+        return counts, edges
+
+    def top_values(self, top_k: int):
+        """高频值；样本中没有重复取值时视为连续型，返回空列表"""
+        step = max(self.n // self.SAMPLE_SIZE, 1)
+        uniques, counts = np.unique(self.values[::step], return_counts=True)
+        repeated = counts > 1
+        if not repeated.any():
+            return []
+        if step > 1:
+            # 样本中重复最多的候选在全量上精确计数；候选所在桶的计数是其出现次数的上界，
+            # 按上界从高到低计数，已有top_k个不低于剩余上界的结果时停止
+            uniques, counts = uniques[repeated], counts[repeated]
+            candidates = uniques[np.argsort(-counts, kind='stable')[:2 * top_k]]
+            bounds = self.freq[self._bin_of(candidates)]
+            exact = []
+            for i in np.argsort(-bounds, kind='stable').tolist():
+                if len(exact) >= top_k and sorted(exact)[-top_k] >= bounds[i]:
+                    break
+                exact.append(int(np.count_nonzero(self.values == candidates[i])))
+            uniques, counts = candidates[np.argsort(-bounds, kind='stable')[:len(exact)]], np.asarray(exact)
+        top = np.argsort(-counts, kind='stable')[:top_k]
+        return [(uniques[i], counts[i]) for i in top.tolist() if counts[i] > 1]
+
+    def outliers(self, lower_fence: float, upper_fence: float, top_k: int):
+        """(离群值数量, 最小的top_k个, 最大的top_k个)，含重复值"""
+        # 下界所在桶及以下、上界所在桶及以上的桶才可能有离群值
+        low_bin = int(self._bin_of(lower_fence)) if lower_fence > self.v_min else -1
+        high_bin = int(self._bin_of(upper_fence)) if upper_fence < self.v_max else self.freq.size
+        if self._tails and low_bin <= self._tails[0] and high_bin >= self._tails[1]:
+            # order_statistics已取出这些桶；picked有序，桶号随取值单调，围栏外的取值正是其首尾
+            picked = self._picked
+        else:
+            selected = self._tail_bins(low_bin, high_bin)
+            if not self.freq[selected].any():
+                return 0, [], []
+            picked = self._select(selected)
+        low = picked[:np.searchsorted(picked, lower_fence, side='left')]
+        high = picked[np.searchsorted(picked, upper_fence, side='right'):]
+        return low.size + high.size, low[:top_k].tolist(), high[-top_k:].tolist()
+
+
 class DataFrameChecker:
     """
     用于检查DataFrame中每列的数据类型和取值范围的工具类
     """
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, profile_columns: bool = False,
+                 facts: Optional[Dict[str, ColumnFacts]] = None):
         """
         初始化DataFrameChecker类
         
         参数:
             df: 要检查的DataFrame
+            profile_columns: 是否记录每列检查的耗时和峰值内存增量（见column_profile）
+            facts: 流式读取时由incremental.IncrementalProfiler累积的各列取值特征
         """
         self.df = df
+        self.facts = facts or {}
         self.result_df = pd.DataFrame(columns=['column_name', 'info'])
+        self.profile_columns = profile_columns
+        self.column_profile = []
         # 常见日期格式模式
         self.date_patterns = [
             # ISO格式 (YYYY-MM-DD)
@@ -206,7 +494,14 @@ class DataFrameChecker:
             r'^\d{10}$': 'UNIX时间戳(秒)',
             r'^\d{13}$': 'UNIX时间戳(毫秒)',
         }
-        
+
+        # 数值列摘要参数
+        self.quantile_levels = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+        self.histogram_bins = 10
+        self.top_k = 5
+        # 键分析计数时的内存预算（MB）
+        self.key_memory_mb = 256
+
     def _is_date(self, text: str) -> bool:
         """
         检查字符串是否为日期格式
@@ -262,12 +557,13 @@ class DataFrameChecker:
                     
         return False
         
-    def _detect_type(self, series: pd.Series) -> str:
+    def _detect_type(self, series: pd.Series, facts: Optional[ColumnFacts] = None) -> str:
         """
         检测Series的数据类型，识别为int、float、text、date或其他类型
         
         参数:
             series: 要检测类型的Series
+            facts: 流式读取时已增量累积的取值特征；给出时不再遍历整列计算这些特征
         
         返回:
             数据类型字符串
@@ -298,7 +594,8 @@ class DataFrameChecker:
                     pass  # 不是有效的列表表示
             
             # 检查是否为日期格式
-            if all(isinstance(x, str) for x in non_null_series):
+            all_str = facts.all_str if facts else all(isinstance(x, str) for x in non_null_series)
+            if all_str:
                 # 抽样检查，如果80%以上是日期格式，则识别为日期类型
                 sample_size = min(100, len(non_null_series))  # 最多检查100个样本
                 sample = non_null_series.sample(sample_size) if len(non_null_series) > sample_size else non_null_series
@@ -307,26 +604,139 @@ class DataFrameChecker:
                     return 'date'
                 
                 # 检查是否为分类文本（唯一值少于5个）
-                if non_null_series.nunique() < 5:
+                if facts.distinct_below(5) if facts else non_null_series.nunique() < 5:
                     return 'category_text'
         
         # 尝试转换为数值类型并检查
-        try:
-            if pd.to_numeric(non_null_series, errors='coerce').notna().all():
-                # 检查是否全为整数
-                if (non_null_series.astype(float) % 1 == 0).all():
-                    # 检查是否为分类型 (独特值少于10)
-                    if non_null_series.nunique() < 10:
-                        return 'category_int'
-                    return 'int'
-                else:
-                    return 'float'
-        except:
-            pass
+        if facts:
+            # 增量特征中整数检查失败记为None，对应下面整列检查时的异常
+            if facts.numeric and facts.integral is not None:
+                if facts.integral:
+                    return 'category_int' if facts.distinct_below(10) else 'int'
+                return 'float'
+        else:
+            try:
+                if pd.to_numeric(non_null_series, errors='coerce').notna().all():
+                    # 检查是否全为整数
+                    if (non_null_series.astype(float) % 1 == 0).all():
+                        # 检查是否为分类型 (独特值少于10)
+                        if non_null_series.nunique() < 10:
+                            return 'category_int'
+                        return 'int'
+                    else:
+                        return 'float'
+            except:
+                pass
+        
+        # 数值混有比较符或定性结果的检验结果列
+        if looks_like_lab_values(non_null_series):
+            return 'lab_value'
         
         # 默认为文本类型
         return 'text'
-    
+
+    def _to_python(self, value: float, is_int: bool) -> Union[int, float]:
+        """将numpy标量转换为可JSON序列化的Python数值"""
+        return int(value) if is_int else float(value)
+
+    def _numeric_summary(self, non_null_series: pd.Series, is_int: bool) -> Dict:
+        """
+        对数值列做摘要，避免对全列做多点partition或排序：
+
+        - 跨度不超过行数的整数列：一次bincount得到频数表，分位数、直方图、高频值和离群值
+          都从频数表及其累计和中读出，均值和标准差也在频数表上计算
+        - 其余列：在细分的等宽桶上计数，直方图由细分桶合并得到（直方图边界两侧细分桶中的取值按边界重新计数，
+          与np.histogram一致）；只取出分位点和围栏外所在桶的原值排序得到精确的分位数和离群值；高频值先在等间隔样本上找候选，再在全量上计数
+
+        参数:
+            non_null_series: 已去除空值的数值Series
+            is_int: 是否为整数列
+
+        返回:
+            包含min/max/mean/median/std、分位数、直方图、高频值和离群值的字典；
+            样本中没有重复取值的连续型列不输出高频值
+        """
+        if not pd.api.types.is_numeric_dtype(non_null_series):
+            non_null_series = pd.to_numeric(non_null_series, errors='coerce')
+        if is_int and pd.api.types.is_integer_dtype(non_null_series):
+            values = non_null_series.to_numpy(dtype=np.int64)
+        else:
+            values = non_null_series.to_numpy(dtype=np.float64)
+            finite = np.isfinite(values)
+            if not finite.all():
+                values = values[finite]
+            if is_int:
+                values = values.astype(np.int64)
+        n = values.size
+        if n == 0:
+            return {"range": "unable to parse"}
+
+        v_min = values.min()
+        v_max = values.max()
+        # 分位点的秩（线性插值，与np.quantile默认一致）；中位数和四分位数总是计算，用于median字段和离群值围栏
+        levels = sorted(set(self.quantile_levels) | {0.25, 0.5, 0.75})
+        positions = np.asarray(levels) * (n - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.ceil(positions).astype(np.int64)
+
+        # 跨度用Python整数计算，避免int64相减溢出
+        if is_int and int(v_max) - int(v_min) < max(n, 1 << 16):
+            summary = _CountedValues(values, v_min)
+        else:
+            summary = _BinnedValues(values, v_min, v_max, self.histogram_bins)
+
+        ranks = np.unique(np.concatenate((lower, upper)))
+        order_stats = dict(zip(ranks.tolist(), summary.order_statistics(
+            ranks, quartile_ranks=(upper[levels.index(0.25)], lower[levels.index(0.75)]))))
+        quantiles = [order_stats[lo] + (order_stats[hi] - order_stats[lo]) * (p - lo)
+                     for lo, hi, p in zip(lower.tolist(), upper.tolist(), positions.tolist())]
+        by_level = dict(zip(levels, quantiles))
+        mean, std = summary.moments()
+
+        result = {
+            "min": float(v_min),
+            "max": float(v_max),
+            "mean": float(mean),
+            "median": float(by_level[0.5]),
+            "std": float(std),
+            "quantiles": {f"p{q * 100:g}": float(by_level[q]) for q in self.quantile_levels},
+        }
+
+        # 等宽直方图
+        counts, edges = summary.histogram(self.histogram_bins)
+        result["histogram"] = {
+            "bin_edges": [float(e) for e in edges],
+            "counts": [int(c) for c in counts],
+        }
+
+        top_values = summary.top_values(self.top_k)
+        if top_values:
+            result["top_values"] = [[self._to_python(v, is_int), int(c)] for v, c in top_values]
+
+        # 离群值：基于IQR的Tukey围栏
+        q1 = by_level[0.25]
+        q3 = by_level[0.75]
+        iqr = q3 - q1
+        lower_fence = q1 - 1.5 * iqr
+        upper_fence = q3 + 1.5 * iqr
+        count, low, high = summary.outliers(lower_fence, upper_fence, self.top_k)
+        result["outliers"] = {
+            "lower_fence": float(lower_fence),
+            "upper_fence": float(upper_fence),
+            "count": count,
+            "low_samples": [self._to_python(v, is_int) for v in low],
+            "high_samples": [self._to_python(v, is_int) for v in high],
+        }
+
+        return result
+
+    def _key_summary(self, series: pd.Series) -> Dict:
+        """标识列的唯一性和重复统计；空值统计已在value_range中，这里不再重复"""
+        stats = analyze_keys(series.to_frame(name='key'), ['key'], self.key_memory_mb, top_k=self.top_k)
+        for duplicated in ("row_count", "null_count"):
+            stats.pop(duplicated)
+        return stats
+
     def _get_value_range(self, series: pd.Series, data_type: str) -> Dict:
         """
         获取Series的取值范围
@@ -349,15 +759,14 @@ class DataFrameChecker:
         result["null_percentage"] = round(float(series.isna().mean() * 100),2)
         
         if data_type == 'int':
-            result["min"] = float(non_null_series.min())
-            result["max"] = float(non_null_series.max())
-            result["mean"] = float(non_null_series.mean())
-            result["median"] = float(non_null_series.median())
+            result.update(self._numeric_summary(non_null_series, is_int=True))
         elif data_type == 'float':
-            result["min"] = float(non_null_series.min())
-            result["max"] = float(non_null_series.max())
-            result["mean"] = float(non_null_series.mean())
-            result["median"] = float(non_null_series.median())
+            result.update(self._numeric_summary(non_null_series, is_int=False))
+        elif data_type == 'lab_value':
+            # 数值统计只用数值部分，比较符和定性结果单独计数
+            parsed = parse_lab_values(non_null_series)
+            result.update(self._numeric_summary(parsed['value'].dropna(), is_int=False))
+            result.update(lab_value_summary(parsed))
         elif data_type == 'text':
             # text类型的value_range设为不适用
             result["description"] = "not applicable"
@@ -434,26 +843,46 @@ class DataFrameChecker:
         """
         result_data = []
         
-        for column in self.df.columns:
-            series = self.df[column]
-            
-            # 检测数据类型
-            data_type = self._detect_type(series)
-            
-            # 获取取值范围
-            value_range = self._get_value_range(series, data_type)
-            
-            # 构建结果
-            info = {
-                "data_type": data_type,
-                "value_range": value_range
-            }
-            
-            # 将结果添加到列表 - 避免双重JSON序列化
-            result_data.append({
-                "column_name": column,
-                "info": info  # 直接保存字典，不转换为JSON字符串
-            })
+        if self.profile_columns:
+            self.column_profile = []
+            # 采样RSS而不是用tracemalloc：后者拦截每次分配，测得的耗时主要是它自身的开销
+            memory = PeakMemorySampler()
+            memory.start()
+        
+        try:
+            for column in self.df.columns:
+                if self.profile_columns:
+                    memory.reset()
+                    start = time.perf_counter()
+                
+                series = self.df[column]
+                
+                # 检测数据类型
+                data_type = self._detect_type(series, self.facts.get(column))
+                
+                # 获取取值范围
+                value_range = self._get_value_range(series, data_type)
+                if "range" not in value_range and is_key_column(column):
+                    value_range["key"] = self._key_summary(series)
+                
+                # 构建结果；宽表时类型化画像比嵌套字典更省内存
+                info = ColumnProfile(data_type, make_range(data_type, value_range))
+                
+                result_data.append({
+                    "column_name": column,
+                    "info": info
+                })
+                
+                if self.profile_columns:
+                    self.column_profile.append({
+                        "column_name": column,
+                        "data_type": data_type,
+                        "wall_time_s": round(time.perf_counter() - start, 6),
+                        "peak_memory_mb": memory.peak_mb(),
+                    })
+        finally:
+            if self.profile_columns:
+                memory.stop()
         
         # 创建结果DataFrame
         self.result_df = pd.DataFrame(result_data)
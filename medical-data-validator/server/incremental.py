@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+"""
+# 流式读取中的增量列画像
+
+待验证数据通过stdin边上传边解析时，每个分块到达后立即累积各列可合并的取值特征：
+空值数、非空值是否都是字符串、是否都能解析为数值、数值是否都是整数，以及不超过上限的不同取值。
+这些正是 DataFrameChecker._detect_type 需要遍历整列才能得到的结果，尤其是文本列上的
+`pd.to_numeric` 和逐值类型检查；在上传期间完成后，最后一个字节到达时类型判断只剩抽样检查。
+
+各特征在分块间的合并方式与在整列上计算的结果一致（"全部满足"取与，不同取值取并集）。
+分块之间数值/文本推断不一致的列会在合并后重新解析，这些列的特征作废，由检查器在整列上计算。
+"""
+
+# 保留的不同取值上限：类型判断只关心不同取值是否少于10个（category_int）或5个（category_text）
+MAX_DISTINCT = 10
+
+
+@dataclass(slots=True)
+class ColumnFacts:
+    """单列的可合并取值特征"""
+    null_count: int = 0
+    # 非空值都是str
+    all_str: bool = True
+    # 非空值都能被pd.to_numeric解析
+    numeric: bool = True
+    # 非空值都是整数；None表示astype(float)失败（整列检查时会抛出异常）
+    integral: Optional[bool] = True
+    # 不同取值，超过MAX_DISTINCT个后为None
+    distinct: Optional[set] = field(default_factory=set)
+
+    def add(self, series: pd.Series):
+        """合并一个分块中该列的取值"""
+        non_null = series.dropna()
+        self.null_count += len(series) - len(non_null)
+        if len(non_null) == 0:
+            return
+
+        if self.all_str and non_null.dtype == 'object':
+            self.all_str = all(isinstance(x, str) for x in non_null)
+        elif self.all_str:
+            self.all_str = isinstance(non_null.dtype, pd.StringDtype)
+        if self.numeric:
+            self.numeric = pd.api.types.is_numeric_dtype(non_null) \
+                or bool(pd.to_numeric(non_null, errors='coerce').notna().all())
+        # 整数检查只在整列都是数值时才有意义，与_detect_type的判断顺序一致
+        if self.numeric and self.integral is not None:
+            try:
+                self.integral = bool((non_null.astype(float) % 1 == 0).all()) and self.integral
+            except (ValueError, TypeError):
+                self.integral = None
+        if self.distinct is not None:
+            # 本块的不同取值超过上限时合并后也必然超过，只取上限+1个
+            self.distinct.update(non_null.unique()[:MAX_DISTINCT + 1].tolist())
+            if len(self.distinct) > MAX_DISTINCT:
+                self.distinct = None
+
+    def distinct_below(self, limit: int) -> bool:
+        """不同取值是否少于limit个（limit不超过MAX_DISTINCT）"""
+        return self.distinct is not None and len(self.distinct) < limit
+
+
+class IncrementalProfiler:
+    """
+    分块输入的增量列画像：用法与ReservoirSampler相同，每个分块调用一次add
+    """
+
+    def __init__(self):
+        self.facts: Dict[str, ColumnFacts] = {}
+
+    def add(self, chunk: pd.DataFrame):
+        """加入一个分块"""
+        for column in chunk.columns:
+            self.facts.setdefault(column, ColumnFacts()).add(chunk[column])
+
+    def discard(self, columns: Iterable[str]):
+        """作废重新解析过的列的特征"""
+        for column in columns:
+            self.facts.pop(column, None)
@@ -0,0 +1,370 @@
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+"""
+# 标识列的主键与重复分析
+
+患者号、就诊号等标识列在画像中只是text，重复ID和孤儿键（在主表中不存在的外键）
+是提取数据中最常见的完整性问题。这里用64位哈希做向量化的键分析：
+
+- 整数键（含整数值的浮点和规范的十进制整数字符串）按int64哈希，其余去除首尾空白后按字符串哈希，
+  保证同一个键在不同文件、不同dtype间哈希一致
+- 逐块对去重后的取值用 `pd.util.hash_array` 计算64位哈希，再按编码映射回每一行；
+  复合键按行组合各列哈希
+- HashCounter 统计不同键数、重复行数等：哈希总量在内存预算内时直接排序计数，
+  超出预算时按哈希高位分区写入临时文件，再逐个分区排序计数，内存占用与行数无关
+- 键集合（去重后排序的uint64数组，每个键8字节）可保存为 .npy，
+  供其他文件做跨文件包含检查（外键是否都出现在主表中）
+
+64位哈希在十亿级不同键下的碰撞概率约为 2.7%（生日界），统计结果是近似值，
+重复样例通过回查原值给出。
+"""
+
+# 列名形如 patient_id / visit_no / MRN / 住院号 / 患者编号 / patientId
+KEY_NAME_PATTERN = re.compile(r'(?:^|[_\s\-])(?:id|no|nbr|num|mrn|uid|uuid|guid|key)$', re.IGNORECASE)
+CAMEL_ID_PATTERN = re.compile(r'[a-z](?:ID|Id)$')
+# 中文列名只认编号、号码、标识和常见的证件/就诊号后缀；"号"结尾的型号、信号、床号等不是标识列
+CHINESE_ID_SUFFIXES = (
+    '编号', '号码', '标识', '标识符',
+    '住院号', '门诊号', '急诊号', '就诊号', '病案号', '病历号', '登记号', '流水号', '档案号',
+    '身份证号', '医保号', '社保号', '卡号', '患者号', '病人号', '检验号', '标本号', '申请号', '体检号',
+)
+CHINESE_KEY_PATTERN = re.compile(rf'(?:{"|".join(CHINESE_ID_SUFFIXES)}|(?<=[\u4e00-\u9fff])ID)$')
+
+
+def is_key_column(name) -> bool:
+    """根据列名判断是否为标识列"""
+    name = str(name).strip()
+    return any(pattern.search(name) for pattern in (KEY_NAME_PATTERN, CAMEL_ID_PATTERN, CHINESE_KEY_PATTERN))
+
+
+# 规范的十进制整数字符串（无前导零、无小数点），与整数键哈希为同一个值
+CANONICAL_INT = r'-?[1-9]\d{0,17}|0'
+
+
+def key_hashes(uniques: pd.Series) -> np.ndarray:
+    """
+    计算去重后、不含空值的键值的64位哈希
+
+    整数值（含整数值的浮点，以及规范的十进制整数字符串）按int64哈希，
+    其余取值去除首尾空白后按字符串哈希。这样同一个键在不同文件、不同dtype下哈希一致，
+    整数ID列也无需转换为字符串
+    """
+    if pd.api.types.is_float_dtype(uniques) or pd.api.types.is_integer_dtype(uniques):
+        values = uniques.to_numpy(dtype=np.float64)
+        if (values % 1 == 0).all():
+            return pd.util.hash_array(uniques.to_numpy().astype(np.int64))
+
+    texts = uniques.astype(str).str.strip().to_numpy(dtype=object)
+    hashes = pd.util.hash_array(texts, categorize=False)
+    is_int = pd.Series(texts).str.fullmatch(CANONICAL_INT).to_numpy(dtype=bool)
+    if is_int.any():
+        hashes[is_int] = pd.util.hash_array(texts[is_int].astype(np.int64))
+    return hashes
+
+
+def key_label(value) -> str:
+    """键值的显示形式，整数值的浮点去掉 .0"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def column_hashes(series: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    计算不含空值的Series每行的64位哈希
+
+    只对去重后的取值计算哈希，再按编码映射回每一行
+
+    返回:
+        (哈希数组, 每行的取值编码, 去重取值)
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques)
+    return key_hashes(uniques)[codes], codes, uniques.to_numpy()
+
+
+def combine_hashes(arrays: List[np.ndarray]) -> np.ndarray:
+    """按行组合多列哈希（乘法-异或混合，列顺序敏感）"""
+    combined = arrays[0].copy()
+    for hashes in arrays[1:]:
+        combined *= np.uint64(0x100000001B3)
+        combined ^= hashes
+    return combined
+
+
+def key_values(parts: List[Tuple[np.ndarray, np.ndarray]], mask: np.ndarray) -> List[str]:
+    """取出mask选中行的键值；复合键用 " | " 连接"""
+    columns = [uniques[codes[mask]] for codes, uniques in parts]
+    return [' | '.join(key_label(value) for value in row) for row in zip(*columns)]
+
+
+def iter_key_chunks(df: pd.DataFrame, columns: List[str],
+                    chunk_rows: int) -> Iterator[Tuple[np.ndarray, List, int]]:
+    """
+    分块计算键哈希，跳过任一键列为空的行
+
+    返回:
+        迭代 (哈希数组, 各键列的(编码, 去重取值)，供key_values取键值, 本块空键行数)
+    """
+    for start in range(0, len(df), chunk_rows):
+        chunk = df[columns].iloc[start:start + chunk_rows]
+        present = chunk.notna().all(axis=1).to_numpy()
+        arrays, parts = [], []
+        for column in columns:
+            hashes, codes, uniques = column_hashes(chunk[column][present])
+            arrays.append(hashes)
+            parts.append((codes, uniques))
+        yield combine_hashes(arrays), parts, int(np.count_nonzero(~present))
+
+
+class HashCounter:
+    """
+    在内存预算内统计64位哈希的出现次数
+    """
+
+    def __init__(self, expected_rows: int, memory_budget_mb: float = 256):
+        """
+        初始化计数器
+
+        参数:
+            expected_rows: 预计的哈希数量（行数），用于决定是否分区落盘
+            memory_budget_mb: 排序计数时允许使用的内存（MB）
+        """
+        budget = max(memory_budget_mb, 1) * 1024 * 1024
+        # 排序需要原数组和副本，按16字节/行估算
+        needed = expected_rows * 16
+        self.bits = 0
+        while needed > budget * (1 << self.bits) and self.bits < 16:
+            self.bits += 1
+        self.partitions = 1 << self.bits
+        self.total = 0
+        self._memory: List[np.ndarray] = []
+        self._spill_dir = tempfile.mkdtemp(prefix='keys_') if self.bits else None
+
+    def _partition_path(self, partition: int) -> str:
+        return os.path.join(self._spill_dir, f'{partition}.bin')
+
+    def add(self, hashes: np.ndarray):
+        """加入一批哈希"""
+        self.total += len(hashes)
+        if not self.bits:
+            self._memory.append(hashes)
+            return
+        # 按高位分区，同一个键总落在同一分区
+        part = (hashes >> np.uint64(64 - self.bits)).astype(np.intp)
+        order = np.argsort(part, kind='stable')
+        hashes = hashes[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(part, minlength=self.partitions))))
+        for partition in range(self.partitions):
+            start, end = bounds[partition], bounds[partition + 1]
+            if end > start:
+                with open(self._partition_path(partition), 'ab') as f:
+                    hashes[start:end].tofile(f)
+
+    def _sorted_partitions(self) -> Iterator[np.ndarray]:
+        """按哈希顺序逐个分区给出排序后的哈希"""
+        if not self.bits:
+            yield np.sort(np.concatenate(self._memory)) if self._memory else np.empty(0, dtype=np.uint64)
+            return
+        for partition in range(self.partitions):
+            path = self._partition_path(partition)
+            if os.path.exists(path):
+                yield np.sort(np.fromfile(path, dtype=np.uint64))
+
+    def stats(self, top_k: int = 5, keyset_path: Optional[str] = None) -> Dict:
+        """
+        统计重复情况
+
+        参数:
+            top_k: 返回的重复哈希数量
+            keyset_path: 给出时同时把去重后的键集合（升序uint64）保存为.npy；
+                         各分区按哈希高位划分，依次拼接即全局有序
+
+        返回:
+            distinct_count、duplicate_rows（超出首次出现的行数）、duplicated_keys（出现多次的键数）、
+            max_multiplicity，以及出现次数最多的top_k个重复哈希 top_hashes: [(哈希, 次数)]
+        """
+        distinct = duplicate_keys = max_count = 0
+        top: List[Tuple[int, int]] = []
+        keyset_file = open(keyset_path + '.tmp', 'wb') if keyset_path else None
+        try:
+            for hashes in self._sorted_partitions():
+                if hashes.size == 0:
+                    continue
+                starts = np.flatnonzero(np.concatenate(([True], hashes[1:] != hashes[:-1])))
+                counts = np.diff(np.append(starts, hashes.size))
+                distinct += starts.size
+                if keyset_file:
+                    hashes[starts].tofile(keyset_file)
+                repeated = counts > 1
+                duplicate_keys += int(np.count_nonzero(repeated))
+                max_count = max(max_count, int(counts.max()))
+                if repeated.any():
+                    idx = np.flatnonzero(repeated)
+                    idx = idx[np.argsort(counts[idx], kind='stable')[::-1][:top_k]]
+                    top.extend((int(hashes[starts[i]]), int(counts[i])) for i in idx)
+        finally:
+            if keyset_file:
+                keyset_file.close()
+        if keyset_path:
+            _raw_to_npy(keyset_path + '.tmp', keyset_path, distinct)
+
+        top.sort(key=lambda item: item[1], reverse=True)
+        return {
+            "distinct_count": distinct,
+            "duplicate_rows": self.total - distinct,
+            "duplicated_keys": duplicate_keys,
+            "max_multiplicity": max_count,
+            "top_hashes": top[:top_k],
+        }
+
+    def close(self):
+        """删除临时分区文件"""
+        self._memory = []
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+
+def _raw_to_npy(raw_path: str, npy_path: str, size: int, block: int = 1 << 22):
+    """把原始uint64文件分块复制为.npy，内存占用与文件大小无关"""
+    out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.uint64, shape=(size,))
+    if size:
+        source = np.memmap(raw_path, dtype=np.uint64, mode='r', shape=(size,))
+        for start in range(0, size, block):
+            out[start:start + block] = source[start:start + block]
+        del source
+    out.flush()
+    del out
+    os.remove(raw_path)
+
+
+def contained(hashes: np.ndarray, keyset: np.ndarray) -> np.ndarray:
+    """判断每个哈希是否在已排序的键集合中"""
+    if keyset.size == 0:
+        return np.zeros(hashes.size, dtype=bool)
+    idx = np.searchsorted(keyset, hashes)
+    idx[idx == keyset.size] = 0
+    return keyset[idx] == hashes
+
+
+def analyze_keys(df: pd.DataFrame, columns: List[str], memory_budget_mb: float = 256,
+                 chunk_rows: int = 1_000_000, top_k: int = 5,
+                 reference: Optional[np.ndarray] = None, keyset_path: Optional[str] = None) -> Dict:
+    """
+    分析单列或复合键的唯一性与重复情况
+
+    参数:
+        df: 数据
+        columns: 键列（多列时为复合键）
+        memory_budget_mb: 计数时的内存预算
+        chunk_rows: 每次哈希的行数
+        top_k: 重复样例、孤儿样例数量
+        reference: 主表的键集合（load_keyset的结果），给出时统计不在其中的孤儿键
+        keyset_path: 给出时把本数据的键集合保存到该路径（.npy）
+
+    返回:
+        包含row_count、null_count、distinct_count、uniqueness、duplicate_rows、duplicated_keys、
+        max_multiplicity、duplicate_samples（[[键值, 次数], ...]），
+        以及给出reference时的orphan_count、orphan_percentage、orphan_samples
+    """
+    counter = HashCounter(len(df), memory_budget_mb)
+    null_count = 0
+    orphan_count = 0
+    orphan_samples: List[str] = []
+    try:
+        for hashes, parts, nulls in iter_key_chunks(df, columns, chunk_rows):
+            null_count += nulls
+            counter.add(hashes)
+            if reference is not None:
+                missing = ~contained(hashes, reference)
+                orphan_count += int(np.count_nonzero(missing))
+                if len(orphan_samples) < top_k:
+                    first = np.zeros(missing.size, dtype=bool)
+                    first[np.flatnonzero(missing)[:top_k * 2]] = True
+                    for value in key_values(parts, first):
+                        if value not in orphan_samples and len(orphan_samples) < top_k:
+                            orphan_samples.append(value)
+
+        stats = counter.stats(top_k, keyset_path)
+    finally:
+        counter.close()
+
+    # 回查出现次数最多的重复哈希对应的原值
+    samples = {}
+    wanted = np.array([h for h, _ in stats["top_hashes"]], dtype=np.uint64)
+    if wanted.size:
+        for hashes, parts, _ in iter_key_chunks(df, columns, chunk_rows):
+            hit = np.isin(hashes, wanted)
+            for h, value in zip(hashes[hit], key_values(parts, hit)):
+                samples.setdefault(int(h), value)
+            if len(samples) == wanted.size:
+                break
+
+    non_null = counter.total
+    result = {
+        "row_count": len(df),
+        "null_count": null_count,
+        "distinct_count": stats["distinct_count"],
+        "uniqueness": round(stats["distinct_count"] / non_null, 6) if non_null else 0.0,
+        "duplicate_rows": stats["duplicate_rows"],
+        "duplicated_keys": stats["duplicated_keys"],
+        "max_multiplicity": stats["max_multiplicity"],
+        "duplicate_samples": [[samples.get(h, ''), count] for h, count in stats["top_hashes"]],
+    }
+    if reference is not None:
+        result["orphan_count"] = orphan_count
+        result["orphan_percentage"] = round(orphan_count / non_null * 100, 2) if non_null else 0.0
+        result["orphan_samples"] = orphan_samples
+    return result
+
+
+def load_keyset(path: str) -> np.ndarray:
+    """以内存映射方式打开保存的键集合"""
+    return np.load(path, mmap_mode='r')
+
+
+def table_key_report(df: pd.DataFrame, key_columns: List[str], composites: List[List[str]],
+                     memory_budget_mb: float = 256, known: Optional[Dict[str, Dict]] = None,
+                     reference_dir: Optional[str] = None, keyset_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    对表中的标识列和复合键做键分析
+
+    参数:
+        df: 数据
+        key_columns: 单列键
+        composites: 复合键列表，每个元素为列名列表
+        memory_budget_mb: 计数时的内存预算
+        known: 已由DataFrameChecker算出的单列结果 {列名: key统计}，无需包含检查时直接复用
+        reference_dir: 主表键集合目录，存在 <列名>.npy 时检查本表的键是否都包含在其中
+        keyset_dir: 给出时把本表单列键的键集合保存为 <列名>.npy，供其他文件作为主表引用
+
+    返回:
+        每个键一行的DataFrame
+    """
+    rows = []
+    for columns in [[column] for column in key_columns] + composites:
+        name = ' + '.join(map(str, columns))
+        reference_path = os.path.join(reference_dir, f'{name}.npy') if reference_dir else None
+        if reference_path and not os.path.exists(reference_path):
+            reference_path = None
+        keyset_path = None
+        if keyset_dir and len(columns) == 1:
+            os.makedirs(keyset_dir, exist_ok=True)
+            keyset_path = os.path.join(keyset_dir, f'{name}.npy')
+
+        if known and len(columns) == 1 and columns[0] in known and not reference_path and not keyset_path:
+            stats = dict(known[columns[0]])
+        else:
+            stats = analyze_keys(df, columns, memory_budget_mb,
+                                 reference=load_keyset(reference_path) if reference_path else None,
+                                 keyset_path=keyset_path)
+        rows.append({"key": name, **stats})
+    return pd.DataFrame(rows)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+"""
+# 检验结果值解析
+
+检验类列常混有数值、带比较符的截断值和定性结果，例如 `5.6`、`<0.5`、`>1000`、`1.2E3`、
+`阴性`、`+++`。`pd.to_numeric(errors='coerce')` 会把这类列整体判为文本，丢失数值统计。
+
+这里用一次向量化正则提取把每个单元格拆成三部分：
+
+- comparator: 比较符（`<`、`>`、`<=`、`>=`，全角和 `≤`/`≥` 统一为半角），无则为空
+- value: 数值部分（float），无法解析为数值的单元格为NaN
+- token: 不含数值的单元格去除首尾空白后的定性结果，数值单元格为空
+
+医疗数据重复度高，正则只在去重后的取值上执行，再按编码映射回每一行，没有逐单元格的Python循环。
+
+判为检验结果列需要数值占多数、非数值取值不多，并且含有比较符或非数值取值都是定性结果词表中的值；
+只混有少量任意字符串（如 "A-17"、"X"）的编号列仍按原类型处理。
+"""
+
+LAB_VALUE_PATTERN = (
+    r'^\s*(?P<comparator><=|>=|≤|≥|<|>|＜|＞)?\s*'
+    r'(?P<number>[-+]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][-+]?[0-9]+)?)\s*$'
+)
+
+COMPARATOR_PREFIX = r'\s*(?:<|>|≤|≥|＜|＞)'
+
+COMPARATOR_ALIASES = {'≤': '<=', '≥': '>=', '＜': '<', '＞': '>'}
+
+# 定性结果词表：阴性/阳性等结论、+/-/± 等符号，以及 "阳性(+)" 这类组合
+_QUALITATIVE_WORD = (
+    r'(?:弱|强)?阳性|阴性|可疑|未检出|检出|极?微量|少量|'
+    r'(?:weakly\s+)?positive|negative|pos|neg|trace|(?:not\s+)?detected'
+)
+_QUALITATIVE_SIGN = r'[+＋]{1,4}|[-－]|±|\+-|\+/-'
+QUALITATIVE_PATTERN = (
+    rf'(?i)(?:{_QUALITATIVE_WORD})'
+    rf'|(?:{_QUALITATIVE_SIGN})'
+    rf'|(?:{_QUALITATIVE_WORD})?\s*[(（]\s*(?:{_QUALITATIVE_SIGN})\s*[)）]'
+)
+
+# 判为检验结果列的条件
+MIN_NUMERIC_SHARE = 0.5     # 数值部分至少占非空单元格的比例
+MAX_QUALITATIVE_TOKENS = 10  # 定性结果的不同取值上限，超过则更像自由文本
+
+
+def _parse_uniques(series: pd.Series):
+    """
+    在去重后的取值上解析
+
+    返回:
+        (codes, comparator, value, token)：codes为每行对应的取值编码（空值为-1），
+        其余三项按取值编码索引
+    """
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    # 带分组的extract比布尔匹配慢得多，只用在带比较符的取值上；普通数值本身就是数值部分
+    numeric = text.str.match(LAB_VALUE_PATTERN).to_numpy(dtype=bool)
+    censored = numeric & text.str.match(COMPARATOR_PREFIX).to_numpy(dtype=bool)
+    number = text.where(numeric)
+    comparator = pd.Series(None, index=text.index, dtype=object)
+    if censored.any():
+        parts = text[censored].str.extract(LAB_VALUE_PATTERN)
+        comparator[censored] = parts['comparator'].replace(COMPARATOR_ALIASES)
+        number[censored] = parts['number']
+    # 匹配到的数值部分都是合法的浮点数写法，直接转换，避免to_numeric遇到空值时的逐个解析
+    value = number.astype(np.float64)
+    token = text.where(value.isna())
+    return codes, comparator, value, token
+
+
+def parse_lab_values(series: pd.Series) -> pd.DataFrame:
+    """
+    将检验结果列拆分为比较符、数值和定性结果
+
+    参数:
+        series: 待解析的Series（任意dtype）
+
+    返回:
+        与series同索引的DataFrame，列为comparator（object）、value（float64）、token（object）；
+        空值行三列均为空
+    """
+    codes, comparator, value, token = _parse_uniques(series)
+
+    # 末尾追加一行空值，空值行的编码-1正好取到它
+    def expand(unique_values, dtype):
+        values = np.append(unique_values.to_numpy(dtype=dtype), None if dtype is object else np.nan)
+        return values[codes]
+
+    return pd.DataFrame({
+        'comparator': expand(comparator, object),
+        'value': expand(value, np.float64),
+        'token': expand(token, object),
+    }, index=series.index)
+
+
+def _judge(numeric_share: float, tokens: pd.Series, has_comparator: bool, screen: bool = False) -> bool:
+    """
+    以数值为主且非数值取值不多时，screen为True直接通过（抽样筛查）；
+    否则还要求含有比较符，或者非数值取值都是词表中的定性结果（阴性、阳性、+、± 等）
+
+    参数:
+        tokens: 非数值取值（已去重）
+    """
+    if numeric_share < MIN_NUMERIC_SHARE or len(tokens) > MAX_QUALITATIVE_TOKENS:
+        return False
+    if screen or has_comparator:
+        return True
+    return len(tokens) > 0 and bool(tokens.str.fullmatch(QUALITATIVE_PATTERN).all())
+
+
+def is_lab_value(parsed: pd.DataFrame) -> bool:
+    """
+    判断解析结果是否像检验结果列：以数值为主，且含有比较符，
+    或者非数值单元格都是词表中的定性结果（阴性、阳性、+、± 等）
+
+    只有少量任意字符串的数值列（如混有 "A-17"、"X" 的编号列）不算检验结果列
+
+    参数:
+        parsed: parse_lab_values的输出（仅非空行）
+    """
+    if len(parsed) == 0:
+        return False
+    tokens = pd.Series(parsed['token'].dropna().unique(), dtype=object)
+    return _judge(parsed['value'].notna().mean(), tokens, parsed['comparator'].notna().any())
+
+
+def _lab_value_evidence(series: pd.Series, screen: bool) -> bool:
+    """与is_lab_value的判断相同，但按取值的出现次数计算，无需把解析结果展开到每一行"""
+    codes, comparator, value, token = _parse_uniques(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(value))
+    total = counts.sum()
+    if total == 0:
+        return False
+    numeric_share = counts[value.notna().to_numpy()].sum() / total
+    tokens = pd.Series(token.dropna().unique(), dtype=object)
+    return _judge(numeric_share, tokens, comparator.notna().any(), screen)
+
+
+def looks_like_lab_values(series: pd.Series, sample_size: int = 1000) -> bool:
+    """
+    判断非空Series是否为检验结果列
+
+    先在等间隔抽取的行上快速筛查，自由文本列无需在全部取值上执行正则；通过筛查后再用全量确认。
+    比较符和定性结果可能很稀少，抽样中没有出现不能说明不是检验结果列，
+    因此筛查只看数值占比和非数值取值的个数
+    """
+    step = max(len(series) // sample_size, 1)
+    if step > 1 and not _lab_value_evidence(series.iloc[::step], screen=True):
+        return False
+    return _lab_value_evidence(series, screen=False)
+
+
+def lab_value_summary(parsed: pd.DataFrame, top_k: int = 10) -> dict:
+    """
+    检验结果列中比较符和定性结果的统计（数值部分的统计由调用方计算）
+
+    返回:
+        numeric_count、qualitative_count、censored_count，
+        comparators（{比较符: 次数}）和qualitative_values（[[定性结果, 次数], ...]）
+    """
+    comparators = parsed['comparator'].value_counts()
+    tokens = parsed['token'].value_counts()
+    return {
+        "numeric_count": int(parsed['value'].notna().sum()),
+        "qualitative_count": int(tokens.sum()),
+        "censored_count": int(comparators.sum()),
+        "comparators": {str(k): int(v) for k, v in comparators.items()},
+        "qualitative_values": [[str(k), int(v)] for k, v in tokens.head(top_k).items()],
+    }
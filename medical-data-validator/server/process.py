@@ -1,64 +1,526 @@
+import io
 import sys
+import os
+import mmap
+import time
+import random
+import queue
+import signal
+import threading
+import hashlib
+import tempfile
 import pandas as pd
 import json
-import pickle
-from itertools import product
+from itertools import product, combinations
 import requests
 from check import DataFrameChecker
+from profiling import PipelineProfiler, profiling_enabled
+from profile_history import ProfileHistory, DEFAULT_TOLERANCES, dataset_key, text_digest, profile_changed
+from rules import RowValidator
+from profiles import profile_real_name
+from keys import is_key_column, table_key_report
+from sampling import ReservoirSampler
+from incremental import IncrementalProfiler
+from schema import PrefixedStream, check_headers, header_source, read_csv_header
 import traceback
 import numpy as np
 from joblib import load as joblib_load
 
+# 工作流调用的超时、重试和对冲参数，可通过环境变量覆盖
+CALL_TIMEOUT = float(os.environ.get('COZE_CALL_TIMEOUT', 120))     # 单次调用超时（秒）
+JOB_DEADLINE = float(os.environ.get('COZE_JOB_DEADLINE', 3600))    # 整个任务的截止时间（秒）
+MAX_RETRIES = int(os.environ.get('COZE_MAX_RETRIES', 3))           # 最大重试次数
+BACKOFF_BASE = float(os.environ.get('COZE_BACKOFF_BASE', 1.0))     # 退避基数（秒）
+BACKOFF_MAX = float(os.environ.get('COZE_BACKOFF_MAX', 30))        # 单次退避上限（秒）
+HEDGE_AFTER = float(os.environ.get('COZE_HEDGE_AFTER', 0))         # 超过该时间仍未返回则发送对冲请求，0表示关闭
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 历史画像存储，PROFILE_HISTORY=0 关闭；PROFILE_TOLERANCES 为JSON格式的容差覆盖
+PROFILE_HISTORY = os.environ.get('PROFILE_HISTORY', '1') != '0'
+PROFILE_HISTORY_DIR = os.environ.get(
+    'PROFILE_HISTORY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profile_history'))
+PROFILE_TOLERANCES = json.loads(os.environ.get('PROFILE_TOLERANCES', '{}'))
+# 历史画像的数据集标识，缺省为待验证文件名（不含扩展名）；也可用 --dataset=<标识> 指定
+PROFILE_DATASET = os.environ.get('PROFILE_DATASET') or None
+
+# 快速预览：先用蓄水池样本生成初步结果，再用全量数据精确复核
+QUICK_LOOK_SAMPLE_SIZE = int(os.environ.get('QUICK_LOOK_SAMPLE_SIZE', 20000))
+QUICK_LOOK_AFTER = float(os.environ.get('QUICK_LOOK_AFTER', 3))   # 开始读取后多少秒生成预览
+
+# 标识列键分析：KEY_COMPOSITES 为JSON格式的复合键列表（缺省为标识列两两组合）；
+# KEY_REFERENCE_DIR 下有主表的 <列名>.npy 时检查孤儿键；KEY_SET_DIR 给出时保存本表的键集合
+KEY_MEMORY_MB = float(os.environ.get('KEY_MEMORY_MB', 256))
+KEY_COMPOSITES = json.loads(os.environ.get('KEY_COMPOSITES', '[]'))
+KEY_REFERENCE_DIR = os.environ.get('KEY_REFERENCE_DIR') or None
+KEY_SET_DIR = os.environ.get('KEY_SET_DIR') or None
+MAX_DEFAULT_COMPOSITES = 10
+
+# 表头预检查，SCHEMA_PRECHECK=0 关闭
+SCHEMA_PRECHECK = os.environ.get('SCHEMA_PRECHECK', '1') != '0'
+SCHEMA_FUZZY_CUTOFF = float(os.environ.get('SCHEMA_FUZZY_CUTOFF', 0.8))   # 模糊匹配的最低相似度
+SCHEMA_MIN_MATCH = float(os.environ.get('SCHEMA_MIN_MATCH', 0.5))         # 能对应到标准的表头最低比例
+
+WORKFLOW_URL = "https://api.coze.cn/v1/workflow/run"
+WORKFLOW_ID = "7512734874189987881"
+
+class RetryableStatusError(requests.HTTPError):
+    """可重试的HTTP状态码（限流或服务端错误）"""
+
+# 快速预览在后台线程中输出，每行协议消息必须整行写出，不能与主线程的输出交错
+_output_lock = threading.Lock()
+
+def _write_line(stream, line):
+    """在锁内一次写出一整行并刷新"""
+    with _output_lock:
+        stream.write(line + '\n')
+        stream.flush()
+
 def print_progress(progress):
     """输出进度信息到标准输出"""
-    print(f"PROGRESS:{progress}", flush=True)
+    _write_line(sys.stdout, f"PROGRESS:{progress}")
 
 def print_error(error_msg):
     """输出错误信息到标准错误"""
-    print(f"ERROR:{error_msg}", file=sys.stderr, flush=True)
+    _write_line(sys.stderr, f"ERROR:{error_msg}")
 
 def print_info(info_msg):
     """输出普通信息到标准输出"""
-    print(f"INFO:{info_msg}", flush=True)
+    _write_line(sys.stdout, f"INFO:{info_msg}")
+
+def print_provisional(result_name):
+    """通知服务器初步结果已生成"""
+    _write_line(sys.stdout, f"PROVISIONAL:{result_name}")
+
+# 文件头魔数 -> 格式
+COMPRESSED_MAGICS = [
+    (b'\x78', 'zlib'),
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x5d\x00\x00', 'lzma'),
+    (b'\x04\x22\x4d\x18', 'lz4'),
+]
+ARROW_FILE_MAGIC = b'ARROW1'
+ARROW_STREAM_MAGIC = b'\xff\xff\xff\xff'
+# joblib在pickle流中用NumpyArrayWrapper记录单独存放的numpy数组。数值列通常在开头附近，
+# 但前面的对象列（字符串等）按普通pickle写出，可能把它推到很靠后的位置
+JOBLIB_MARKER = b'NumpyArrayWrapper'
+SNIFF_BYTES = 1 << 16
+
+def contains_marker(file_path, marker, start=0):
+    """以内存映射方式在文件中查找marker，不把文件读入内存"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # 从start前回退len(marker)字节，覆盖跨越边界的情况
+            return mapped.find(marker, max(start - len(marker), 0)) != -1
+
+def detect_format(file_path):
+    """
+    根据文件头判断序列化格式
+
+    返回:
+        'arrow' / 'arrow_stream' / 'joblib' / 'joblib_compressed' / 'pickle'，
+        无法识别（如协议0/1的pickle）时返回None
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(SNIFF_BYTES)
+
+    if header.startswith(ARROW_FILE_MAGIC):
+        return 'arrow'
+    if header.startswith(ARROW_STREAM_MAGIC):
+        return 'arrow_stream'
+    if header[:1] == b'\x80' and len(header) > 1 and 2 <= header[1] <= 5:
+        # pickle协议2-5以PROTO操作码开头；文件头中没有标记时再扫描整个文件
+        if JOBLIB_MARKER in header or contains_marker(file_path, JOBLIB_MARKER, len(header)):
+            return 'joblib'
+        return 'pickle'
+    for magic, _ in COMPRESSED_MAGICS:
+        if header.startswith(magic):
+            return 'joblib_compressed'
+    return None
+
+def load_arrow(file_path, stream=False):
+    """以内存映射方式读取Arrow IPC文件，转换时逐列释放Arrow内存以避免内存翻倍"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("读取Arrow文件需要安装pyarrow")
+
+    with pa.memory_map(file_path, 'r') as source:
+        reader = pa.ipc.open_stream(source) if stream else pa.ipc.open_file(source)
+        table = reader.read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
 def load_data(file_path):
-    """加载数据文件"""
+    """加载数据文件；非CSV文件根据文件头直接选择对应的加载方式"""
     try:
         if file_path.endswith('.csv'):
             return pd.read_csv(file_path, low_memory=False)  # 添加low_memory=False来避免警告
-        elif file_path.endswith('.pkl'):
+
+        file_format = detect_format(file_path)
+        print_info(f"识别到文件格式: {file_format}")
+        if file_format == 'arrow':
+            return load_arrow(file_path)
+        elif file_format == 'arrow_stream':
+            return load_arrow(file_path, stream=True)
+        elif file_format == 'joblib':
+            # 数值数组以只读内存映射方式打开，不读入内存
+            return joblib_load(file_path, mmap_mode='r')
+        elif file_format == 'joblib_compressed':
+            # 压缩文件无法内存映射
+            return joblib_load(file_path)
+        else:
+            # 普通pickle，或无法从文件头识别的旧协议pickle
             try:
-                # 首先尝试使用joblib加载
-                print_info("尝试使用joblib加载文件...")
+                return pd.read_pickle(file_path)
+            except Exception as e:
+                # joblib也能读取普通pickle，识别有误时仍可加载
+                print_info(f"按pickle读取失败（{str(e)}），改用joblib读取")
                 return joblib_load(file_path)
-            except Exception as e1:
-                print_error(f"joblib加载失败: {str(e1)}")
-                try:
-                    # 如果joblib失败，尝试使用pandas加载
-                    print_info("尝试使用pandas加载文件...")
-                    return pd.read_pickle(file_path)
-                except Exception as e2:
-                    print_error(f"pandas加载失败: {str(e2)}")
-                    try:
-                        # 最后尝试使用pickle加载
-                        print_info("尝试使用pickle加载文件...")
-                        with open(file_path, 'rb') as f:
-                            return pickle.load(f)
-                    except Exception as e3:
-                        print_error(f"pickle加载失败: {str(e3)}")
-                        raise
-        else:
-            raise ValueError(f"不支持的文件格式: {file_path}")
     except Exception as e:
         print_error(f"加载文件 {file_path} 时出错: {str(e)}")
         raise
 
-def process_data(standard_file, validation_file, output_file):
-    """处理数据并输出结果"""
+class SpoolingStream(io.RawIOBase):
+    """
+    读取原始流的同时把读出的字节写入临时文件
+
+    stdin只能读取一次；解析结束后需要重新解析个别列时从临时文件读取
+    """
+
+    def __init__(self, stream, spool):
+        self.stream = stream
+        self.spool = spool
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.spool.write(data)
+        return size
+
+def load_csv_stream(stream, chunksize=50000, sampler=None, rename=None, incremental=None):
+    """
+    从字节流（如stdin）或文件路径增量解析CSV，上传尚未结束时即可开始解析
+
+    各分块独立推断类型，合并后若同一列既有数值分块又有文本分块，
+    则从文件（stdin输入时为读取时写下的临时副本）按整列重新解析这些列，
+    与一次性读取整个文件时的推断结果完全一致。
+    传入sampler时，每个分块同时送入蓄水池抽样；传入incremental（IncrementalProfiler）时，
+    每个分块同时累积列画像所需的取值特征；传入rename时按表头预检查结果重命名列
+    """
+    spool = None
+    source = stream
+    if not isinstance(stream, str):
+        spool = tempfile.TemporaryFile()
+        source = io.BufferedReader(SpoolingStream(stream, spool))
+
+    try:
+        chunks = []
+        row_count = 0
+        for chunk in pd.read_csv(source, low_memory=False, chunksize=chunksize):
+            if rename:
+                chunk = chunk.rename(columns=rename)
+            chunks.append(chunk)
+            row_count += len(chunk)
+            print_info(f"已接收并解析 {row_count} 行")
+            if sampler:
+                sampler.add(chunk)
+            if incremental:
+                incremental.add(chunk)
+
+        if not chunks:
+            raise ValueError("待验证数据为空")
+
+        df = pd.concat(chunks, ignore_index=True)
+        mixed = []
+        for position, column in enumerate(df.columns):
+            kinds = {pd.api.types.is_numeric_dtype(chunk[column]) for chunk in chunks if chunk[column].notna().any()}
+            if len(kinds) > 1:
+                mixed.append(position)
+        if mixed:
+            print_info(f"{len(mixed)} 列在各分块中的类型推断不一致，按整列重新解析")
+            if spool:
+                spool.seek(0)
+            reparsed = pd.read_csv(spool or stream, usecols=mixed, low_memory=False)
+            for i, position in enumerate(mixed):
+                df.isetitem(position, reparsed.iloc[:, i])
+            if incremental:
+                incremental.discard(df.columns[mixed])
+        return df
+    finally:
+        if spool:
+            spool.close()
+
+def write_result_store(result_df, output_file):
+    """
+    在结果CSV旁写入紧凑的结果存储，供服务器分页读取而无需重新解析CSV
+
+    生成两个文件:
+        <output>.jsonl     每行一个JSON对象（一条结果）
+        <output>.idx.json  行偏移索引: 每行的起始字节偏移、按判断结果分组的行号及内容指纹
+    """
+    base = os.path.splitext(output_file)[0]
+    data_path = base + '.jsonl'
+    index_path = base + '.idx.json'
+
+    offsets = []
+    verdicts = {}
+    digest = hashlib.sha1()
+    position = 0
+    # 缺失值写为null：json.dumps默认写出的NaN不是合法JSON，服务器端JSON.parse会失败
+    records = result_df.astype(object).where(result_df.notna(), None).to_dict(orient='records')
+    with open(data_path, 'wb') as f:
+        for row_id, row in enumerate(records):
+            line = (json.dumps(row, ensure_ascii=False, separators=(',', ':'), allow_nan=False) + '\n').encode('utf-8')
+            offsets.append(position)
+            f.write(line)
+            digest.update(line)
+            position += len(line)
+            verdicts.setdefault(str(row.get('判断结果', '未知')), []).append(row_id)
+    offsets.append(position)
+
+    index = {
+        "version": 1,
+        "data_file": os.path.basename(data_path),
+        "total": len(offsets) - 1,
+        "offsets": offsets,
+        "verdicts": verdicts,
+        "etag": digest.hexdigest(),
+    }
+    # 先写临时文件再替换，避免服务器读到写了一半的索引
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return index_path
+
+def _post_hedged(url, headers, body, timeout):
+    """
+    发送一次工作流请求；启用对冲时，若首个请求超过HEDGE_AFTER秒仍未返回，
+    再并发发送一个相同的请求，取先成功返回的结果
+
+    工作流只做判断不产生副作用，重复请求是安全的。只有2xx响应算作成功：
+    一个请求先返回限流或服务端错误时继续等待另一个请求，两个都失败时返回最后收到的结果，
+    由调用方按状态码重试。请求线程为守护线程，未采用的请求由各自的超时约束，不会阻塞进程退出
+    """
+    if HEDGE_AFTER <= 0 or HEDGE_AFTER >= timeout:
+        return requests.post(url, headers=headers, data=body, timeout=timeout)
+
+    outcomes = queue.Queue()
+
+    def attempt(attempt_timeout):
+        try:
+            response = requests.post(url, headers=headers, data=body, timeout=attempt_timeout)
+            outcomes.put((200 <= response.status_code < 300, response))
+        except Exception as e:
+            outcomes.put((False, e))
+
+    threading.Thread(target=attempt, args=(timeout,), daemon=True).start()
+    launched = 1
+    try:
+        ok, value = outcomes.get(timeout=HEDGE_AFTER)
+    except queue.Empty:
+        print_info(f"请求超过 {HEDGE_AFTER} 秒未返回，发送对冲请求")
+        threading.Thread(target=attempt, args=(timeout - HEDGE_AFTER,), daemon=True).start()
+        launched = 2
+        ok, value = outcomes.get()
+
+    received = 1
+    while not ok and received < launched:
+        ok, value = outcomes.get()
+        received += 1
+    if ok or isinstance(value, requests.Response):
+        return value
+    raise value
+
+def post_workflow(url, headers, payload, deadline):
+    """
+    调用工作流，带单次超时、任务截止时间、指数退避重试（全抖动）和可选的对冲请求
+
+    参数:
+        url: 工作流接口地址
+        headers: 请求头
+        payload: 请求体字典
+        deadline: 任务截止时间（time.monotonic()时间点）
+
+    返回:
+        成功的requests.Response
+    """
+    body = json.dumps(payload)
+    for attempt in range(MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("任务已超过截止时间")
+
+        try:
+            response = _post_hedged(url, headers, body, min(CALL_TIMEOUT, remaining))
+            if response.status_code in RETRY_STATUS:
+                raise RetryableStatusError(f"HTTP {response.status_code}", response=response)
+            response.raise_for_status()
+            return response
+        except (requests.ConnectionError, requests.Timeout, RetryableStatusError) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                raise
+            print_info(f"API请求失败（{str(e)}），{delay:.1f} 秒后第 {attempt + 1} 次重试")
+            time.sleep(delay)
+
+def precheck_schema(validation_file, standard_df):
+    """
+    只读取待验证数据的表头并与标准对应，不匹配时在加载数据前直接失败
+
+    返回:
+        (重命名映射 {表头: 标准列名}, stdin输入时供后续解析使用的流或None)
+    """
+    stream = None
+    if validation_file == '-':
+        # 读走的表头行再拼回流的开头
+        header_line = sys.stdin.buffer.readline()
+        stream = io.BufferedReader(PrefixedStream(header_line, sys.stdin.buffer))
+        headers = read_csv_header(io.BytesIO(header_line))
+    else:
+        file_format = None if validation_file.endswith('.csv') else detect_format(validation_file)
+        read_header = header_source(validation_file, file_format)
+        if read_header is None:
+            print_info("该格式无法只读取表头，跳过表头预检查")
+            return {}, stream
+        headers = read_header()
+
+    result = check_headers(headers, standard_df, SCHEMA_FUZZY_CUTOFF, SCHEMA_MIN_MATCH)
+    print_info(f"表头预检查通过: {len(result['exact'])} 列完全一致，{len(result['rename'])} 列需重命名，"
+               f"{len(result['unmatched'])} 列在标准中没有对应")
+    for header, column in result['rename'].items():
+        print_info(f"列 {header} 对应到标准列 {column}")
+    if result['unmatched']:
+        print_info(f"标准中没有对应的列: {', '.join(result['unmatched'])}")
+    if result['duplicated']:
+        print_info(f"与其他列对应到同一标准列，保持原名: {', '.join(result['duplicated'])}")
+    return result['rename'], stream
+
+def columns_to_judge(report_df):
+    """需要送去判断的列（目前只处理前3列）"""
+    return report_df[:3]
+
+def judge_column(column_name, profile, sd_info, headers, deadline):
+    """
+    调用工作流判断单列，返回结果行
+
+    参数:
+        profile: 待验证数据该列的ColumnProfile
+        sd_info: 标准中该列的info原文
+    """
+    data = {
+        "workflow_id": WORKFLOW_ID,
+        "parameters": {
+            "input": {
+                "name": column_name,
+                "distribution": profile.to_dict(),
+                "sd_distribution": sd_info,
+            }
+        },
+    }
+    response = post_workflow(WORKFLOW_URL, headers, data, deadline)
+
+    # 保持原有的响应解析方式
+    response_data = json.loads(json.loads(response.json()['data'])['data'])
+    return {
+        '字段名': column_name,
+        '字段含义': profile_real_name(sd_info) or '',
+        '判断结果': response_data.get('判断结果', '未知'),
+        '问题类别': '\n'.join([f"{i+1}. {item}" for i, item in enumerate(response_data.get('问题类别', ['无']))]) if '不' in response_data.get('判断结果', '') else '无',
+        '清洗建议': '\n'.join([f"{i+1}. {item}" for i, item in enumerate(response_data.get('清洗建议', ['无']))])if '不' in response_data.get('判断结果', '') else '无'
+    }
+
+def lookup_standard(standard_df, column_name):
+    """获取标准数据中的对应列信息"""
+    return standard_df[standard_df['column_name'] == column_name]['info'].values[0]
+
+def save_results(results, output_file):
+    """保存结果CSV及分页读取用的结果存储"""
+    result_df = pd.DataFrame(results)
+    result_df.to_csv(output_file, index=False)
+    write_result_store(result_df, output_file)
+
+def with_provisional(result, column_name, provisional):
+    """
+    为结果行加上初步判断结果；没有初步结果的列（初步判断失败等）为空字符串，
+    保证所有结果行的列一致
+    """
+    verdict = provisional[column_name][1]['判断结果'] if column_name in provisional else ''
+    return {**result, '初步判断结果': verdict}
+
+def quick_look(sample_df, seen_rows, standard_df, headers, deadline, output_file, provisional, history=None):
+    """
+    用样本生成初步结果并保存为 <result>.provisional.csv
+
+    判断过的列写入provisional: 列名 -> (样本画像, 结果行)，供精确复核时比较；
+    样本画像与历史相比未发生实质变化的列复用历史结果，不调用工作流
+    """
+    try:
+        print_info(f"基于 {len(sample_df)} 行样本（已读取 {seen_rows} 行）生成初步结果...")
+        report_df = DataFrameChecker(sample_df).generate_report()
+        results = []
+        for _, data in columns_to_judge(report_df).iterrows():
+            column_name = data['column_name']
+            try:
+                sd_info = lookup_standard(standard_df, column_name)
+                result = None
+                if history:
+                    result, reason = history.reusable_result(column_name, data['info'], text_digest(sd_info))
+                    if result is not None:
+                        print_info(f"初步判断列 {column_name} 复用历史判断结果: {reason}")
+                if result is None:
+                    result = judge_column(column_name, data['info'], sd_info, headers, deadline)
+            except Exception as e:
+                print_error(f"初步判断列 {column_name} 失败: {str(e)}")
+                continue
+            provisional[column_name] = (data['info'], result)
+            results.append(result)
+
+        if results:
+            provisional_file = os.path.splitext(output_file)[0] + '.provisional.csv'
+            save_results(results, provisional_file)
+            print_provisional(os.path.basename(provisional_file))
+    except Exception as e:
+        print_error(f"生成初步结果失败: {str(e)}")
+
+def history_dataset(validation_file, dataset=None):
+    """历史画像的数据集标识：显式指定的标识，否则为待验证文件名（不含扩展名）；stdin输入且未指定时为None"""
+    if dataset:
+        return dataset_key(dataset)
+    if validation_file == '-':
+        return None
+    return dataset_key(os.path.basename(validation_file).split('.')[0])
+
+def process_data(standard_file, validation_file, output_file, profile=False, quick=False, dataset=None):
+    """
+    处理数据并输出结果
+
+    profile为True时在结果文件旁保存性能剖析输出；
+    quick为True时先基于蓄水池样本输出初步结果，再用全量数据精确复核；
+    dataset为历史画像的数据集标识，缺省见history_dataset
+    """
+    deadline = time.monotonic() + JOB_DEADLINE
+    profiler = PipelineProfiler(output_file, enabled=profile)
+    checker = None
+    history = None
+    quick_thread = None
+    provisional = {}
+    incremental = None
+    profiler.start()
     try:
         print_info("开始加载标准数据...")
         try:
-            standard_df = pd.read_csv(standard_file)
+            with profiler.span("load_standard"):
+                standard_df = pd.read_csv(standard_file)
             if 'column_name' not in standard_df.columns or 'info' not in standard_df.columns:
                 raise ValueError("标准数据文件格式错误：必须包含 'column_name' 和 'info' 列")
             print_info(f"标准数据加载完成，共 {len(standard_df)} 行")
@@ -66,16 +528,6 @@ def process_data(standard_file, validation_file, output_file):
             print_error(f"加载标准数据失败: {str(e)}")
             raise
 
-        print_info("开始加载待验证数据...")
-        try:
-            input_df = load_data(validation_file)
-            print_info(f"待验证数据加载完成，共 {len(input_df)} 行")
-        except Exception as e:
-            print_error(f"加载待验证数据失败: {str(e)}")
-            raise
-
-        # API URL
-        url = "https://api.coze.cn/v1/workflow/run"
         with open("api_key.txt", "r") as f:
             api_key = f.read().strip()
 
@@ -85,19 +537,80 @@ def process_data(standard_file, validation_file, output_file):
             "Content-Type": "application/json",
         }
 
+        dataset = history_dataset(validation_file, dataset)
+        if PROFILE_HISTORY and dataset:
+            # 以数据集本身区分历史：同一数据集的各期数据共享历史，标准是否变化由每列的standard_hash判断；
+            # 在读取数据前打开，快速预览也要查询历史
+            history = ProfileHistory(PROFILE_HISTORY_DIR, dataset, PROFILE_TOLERANCES)
+            print_info(f"使用历史画像存储: {history.path}")
+        elif PROFILE_HISTORY:
+            print_info("stdin输入未指定数据集标识（--dataset），不使用历史画像")
+
+        rename = {}
+        validation_stream = None
+        if SCHEMA_PRECHECK:
+            print_info("表头预检查...")
+            try:
+                with profiler.span("schema_precheck"):
+                    rename, validation_stream = precheck_schema(validation_file, standard_df)
+            except Exception as e:
+                print_error(f"表头预检查失败: {str(e)}")
+                raise
+
+        sampler = None
+        if quick:
+            # 样本就绪后在后台线程中生成初步结果，主线程继续读取
+            def start_quick_look(sample_df, seen_rows):
+                nonlocal quick_thread
+                quick_thread = threading.Thread(
+                    target=quick_look,
+                    args=(sample_df, seen_rows, standard_df, headers, deadline, output_file, provisional, history),
+                    daemon=True,
+                )
+                quick_thread.start()
+
+            sampler = ReservoirSampler(QUICK_LOOK_SAMPLE_SIZE, QUICK_LOOK_AFTER, start_quick_look)
+
+        print_info("开始加载待验证数据...")
+        try:
+            with profiler.span("load_validation"):
+                if validation_file == '-':
+                    # 服务器正在通过stdin转发上传中的CSV，边接收边累积列画像所需的特征
+                    incremental = IncrementalProfiler()
+                    input_df = load_csv_stream(validation_stream or sys.stdin.buffer, sampler=sampler,
+                                               rename=rename, incremental=incremental)
+                elif sampler and validation_file.endswith('.csv'):
+                    incremental = IncrementalProfiler()
+                    input_df = load_csv_stream(validation_file, sampler=sampler, rename=rename,
+                                               incremental=incremental)
+                else:
+                    input_df = load_data(validation_file)
+                    if rename:
+                        input_df = input_df.rename(columns=rename)
+                    if sampler:
+                        sampler.add(input_df)
+                if sampler:
+                    sampler.finish()
+            print_info(f"待验证数据加载完成，共 {len(input_df)} 行")
+        except Exception as e:
+            print_error(f"加载待验证数据失败: {str(e)}")
+            raise
+
         # 初始化结果列表
         results = []
 
         print_info("初始化检查器...")
         try:
-            checker = DataFrameChecker(input_df)
+            checker = DataFrameChecker(input_df, profile_columns=profile,
+                                       facts=incremental.facts if incremental else None)
         except Exception as e:
             print_error(f"初始化检查器失败: {str(e)}")
             raise
 
         print_info("生成报告...")
         try:
-            data_df = checker.generate_report()
+            with profiler.span("check_all_columns", columns=len(input_df.columns)):
+                data_df = checker.generate_report()
             if data_df.empty:
                 raise ValueError("生成的报告为空")
             print_info(f"报告生成完成，共 {len(data_df)} 列")
@@ -105,56 +618,111 @@ def process_data(standard_file, validation_file, output_file):
             print_error(f"生成报告失败: {str(e)}")
             raise
 
+        print_info("执行行级规则校验...")
+        try:
+            with profiler.span("row_rules"):
+                validator = RowValidator(input_df, standard_df)
+                rules_df = validator.validate()
+                base = os.path.splitext(output_file)[0]
+                rules_df.to_csv(base + '.rules.csv', index=False)
+                violation_count = validator.save_violations(base + '.violations.npz')
+            for _, rule in rules_df[rules_df['violation_count'] > 0].iterrows():
+                print_info(f"列 {rule['column_name']} 违反规则 {rule['rule']}: {rule['violation_count']} 行")
+            print_info(f"行级规则校验完成，共 {violation_count} 处违规")
+        except Exception as e:
+            # 行级校验失败不影响列级判断
+            print_error(f"行级规则校验失败: {str(e)}")
+
+        print_info("执行标识列键分析...")
+        try:
+            with profiler.span("key_analysis"):
+                key_columns = [column for column in input_df.columns if is_key_column(column)]
+                if KEY_COMPOSITES:
+                    composites = [columns for columns in KEY_COMPOSITES
+                                  if all(column in input_df.columns for column in columns)]
+                else:
+                    composites = [list(pair) for pair in combinations(key_columns, 2)][:MAX_DEFAULT_COMPOSITES]
+                if key_columns or composites:
+                    # 单列键的统计已由检查器算出
+                    known = {
+                        row['column_name']: row['info'].value_range.key
+                        for _, row in data_df.iterrows()
+                        if row['info'].value_range.key is not None
+                    }
+                    keys_df = table_key_report(input_df, key_columns, composites, KEY_MEMORY_MB,
+                                               known, KEY_REFERENCE_DIR, KEY_SET_DIR)
+                    keys_df.to_csv(os.path.splitext(output_file)[0] + '.keys.csv', index=False)
+                    for _, key in keys_df.iterrows():
+                        if key['duplicate_rows'] > 0:
+                            print_info(f"键 {key['key']} 有 {key['duplicated_keys']} 个键重复出现，共 {key['duplicate_rows']} 行重复")
+                        if key.get('orphan_count', 0) > 0:
+                            print_info(f"键 {key['key']} 有 {int(key['orphan_count'])} 行不在主表中")
+                    print_info(f"键分析完成，共 {len(keys_df)} 个键")
+                else:
+                    print_info("未发现标识列，跳过键分析")
+        except Exception as e:
+            # 键分析失败不影响列级判断
+            print_error(f"键分析失败: {str(e)}")
+
+        if quick_thread:
+            print_info("等待初步结果完成后开始精确复核...")
+            quick_thread.join()
+
         total_columns = len(data_df)
         processed_columns = 0
 
-        # 处理前3列数据
-        for _, data in data_df[:3].iterrows():
+        for _, data in columns_to_judge(data_df).iterrows():
+            if time.monotonic() >= deadline:
+                print_error(f"任务超过截止时间 {JOB_DEADLINE} 秒，停止处理剩余列")
+                break
             try:
                 column_name = data['column_name']
                 info = data['info']
                 
                 print_info(f"处理列: {column_name}")
                 
-                # 直接使用info，不需要replace
+                # 类型化画像，调用工作流时才转为字典
                 distribution = info
                 
                 # 获取标准数据中的对应列信息
                 try:
-                    sd_info = standard_df[standard_df['column_name'] == column_name]['info'].values[0]
-                    sd_distribution = sd_info
+                    sd_info = lookup_standard(standard_df, column_name)
                 except Exception as e:
                     print_error(f"获取列 {column_name} 的标准数据失败: {str(e)}")
                     continue
 
-                data = {
-                    "workflow_id": "7512734874189987881",
-                    "parameters": {
-                        "input": {
-                            "name": column_name,
-                            "distribution": distribution,
-                            "sd_distribution": sd_distribution,
-                        }
-                    },
-                }
-
-                print_info(f"发送API请求: {column_name}")
+                # 画像未发生实质变化时复用上次的判断结果
+                standard_hash = text_digest(sd_info)
+                if history:
+                    reused, reason = history.reusable_result(column_name, distribution, standard_hash)
+                    if reused is not None:
+                        print_info(f"列 {column_name} 复用历史判断结果: {reason}")
+                        results.append(with_provisional(reused, column_name, provisional) if quick else reused)
+                        processed_columns += 1
+                        print_progress((processed_columns / total_columns) * 100)
+                        continue
+                    print_info(f"列 {column_name} 需要重新判断: {reason}")
+
+                # 精确画像与样本画像无实质差异时沿用初步结果
+                result = None
+                if column_name in provisional:
+                    sample_info, provisional_result = provisional[column_name]
+                    changed, reason = profile_changed(sample_info, distribution, {**DEFAULT_TOLERANCES, **PROFILE_TOLERANCES})
+                    if not changed:
+                        print_info(f"列 {column_name} 精确画像与样本一致，沿用初步结果")
+                        result = provisional_result
+                    else:
+                        print_info(f"列 {column_name} 精确画像与样本不同（{reason}），重新判断")
+
                 try:
-                    response = requests.post(url, headers=headers, data=json.dumps(data))
-                    response.raise_for_status()
-                    
-                    # 保持原有的响应解析方式
-                    response_data = json.loads(json.loads(response.json()['data'])['data'])
-                    
-                    # 将结果添加到列表
-                    result = {
-                        '字段名': column_name,
-                        '字段含义': json.loads(sd_info.replace("'", '"')).get('real_name', ''),
-                        '判断结果': response_data.get('判断结果', '未知'),
-                        '问题类别': '\n'.join([f"{i+1}. {item}" for i, item in enumerate(response_data.get('问题类别', ['无']))]) if '不' in response_data.get('判断结果', '') else '无',
-                        '清洗建议': '\n'.join([f"{i+1}. {item}" for i, item in enumerate(response_data.get('清洗建议', ['无']))])if '不' in response_data.get('判断结果', '') else '无'
-                    }
-                    results.append(result)
+                    if result is None:
+                        print_info(f"发送API请求: {column_name}")
+                        with profiler.span("api_call", column=column_name):
+                            result = judge_column(column_name, distribution, sd_info, headers, deadline)
+                    if history:
+                        history.record(column_name, distribution, standard_hash, result)
+                    # 仅本次结果需要，不写入历史
+                    results.append(with_provisional(result, column_name, provisional) if quick else result)
                     
                 except Exception as e:
                     print_error(f"API请求失败: {str(e)}")
@@ -176,8 +744,8 @@ def process_data(standard_file, validation_file, output_file):
         print_info("保存结果...")
         try:
             # 从列表创建DataFrame
-            result_df = pd.DataFrame(results)
-            result_df.to_csv(output_file, index=False)
+            with profiler.span("save_results"):
+                save_results(results, output_file)
             print_info("结果保存完成")
         except Exception as e:
             print_error(f"保存结果失败: {str(e)}")
@@ -190,14 +758,29 @@ def process_data(standard_file, validation_file, output_file):
         print_error(traceback.format_exc())
         return False
 
+    finally:
+        if history:
+            history.close()
+        profiler.stop()
+        for path in profiler.save(checker.column_profile if checker else None):
+            print_info(f"性能剖析输出: {path}")
+
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print_error("Usage: python process.py <standard_file> <validation_file> <output_file>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 3:
+        print_error("Usage: python process.py <standard_file> <validation_file|-> <output_file> "
+                    "[--profile] [--quick-look] [--dataset=<id>]")
         sys.exit(1)
     
-    standard_file = sys.argv[1]
-    validation_file = sys.argv[2]
-    output_file = sys.argv[3]
+    # 服务器取消任务时发送SIGTERM，转为SystemExit以便正常退出
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    standard_file = args[0]
+    validation_file = args[1]
+    output_file = args[2]
     
-    success = process_data(standard_file, validation_file, output_file)
+    quick = '--quick-look' in sys.argv or os.environ.get('QUICK_LOOK', '') not in ('', '0')
+    dataset = next((arg.split('=', 1)[1] for arg in sys.argv[1:] if arg.startswith('--dataset=')), PROFILE_DATASET)
+    success = process_data(standard_file, validation_file, output_file,
+                           profile=profiling_enabled(sys.argv), quick=quick, dataset=dataset)
     sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from profiles import ColumnProfile, parse_info, parse_profile
+
+"""
+# 历史画像存储
+
+每个数据集一个SQLite文件（<history_dir>/<dataset>.sqlite），按列名建索引，
+保存每次实际送去判断的列画像（DataFrameChecker的info，以ColumnProfile紧凑编码存放）及判断结果。
+数据集标识是待验证数据本身的身份（显式指定的标识或文件名），与标准无关；
+每条记录带有判断时所用标准的摘要，修改标准只使引用了改动部分的列重新判断。
+
+新一轮验证时，用新画像与该列最近一次判断时的画像比较：
+若在容差范围内且标准未变，则直接复用上次的判断结果，不再调用工作流。
+复用时不写入新记录，缓慢漂移会持续与最后一次判断时的画像比较，累计超出容差后重新判断。
+"""
+
+# 默认容差，可通过环境变量 PROFILE_TOLERANCES（JSON）覆盖部分或全部
+DEFAULT_TOLERANCES = {
+    "null_percentage": 1.0,   # 空值百分比的绝对变化（百分点）
+    "numeric_shift": 0.1,     # 均值/分位数变化、取值范围扩大相对旧标准差（或极差）的比例
+    "outlier_share": 0.5,     # 离群值占非空值比例的绝对变化（百分点）
+    "date_shift_days": 45,    # 最早/最晚日期的变化天数
+}
+
+NUMERIC_KEYS = ["mean", "median"]
+QUANTILE_KEYS = ["p5", "p25", "p75", "p95"]
+EXACT_KEYS = ["range", "description", "date_info"]
+
+
+def dataset_key(name: str) -> str:
+    """数据集标识 -> 可用作文件名的形式"""
+    return re.sub(r'[^\w.-]', '_', str(name).strip()).strip('.') or '_'
+
+
+def text_digest(text) -> str:
+    """计算任意可序列化对象的SHA1"""
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _numeric_scale(value_range: Dict) -> float:
+    """数值比较的尺度：优先标准差，其次极差"""
+    scale = value_range.get("std") or 0.0
+    if not scale:
+        scale = abs((value_range.get("max") or 0.0) - (value_range.get("min") or 0.0))
+    return scale or 1.0
+
+
+def _outlier_share(value_range: Dict) -> Tuple[int, float]:
+    """(离群值数量, 离群值占非空值的百分比)；非空值数由直方图计数求和得到"""
+    count = (value_range.get("outliers") or {}).get("count") or 0
+    total = sum((value_range.get("histogram") or {}).get("counts") or [])
+    return count, (100.0 * count / total if total else 0.0)
+
+
+def profile_changed(old: Dict, new: Dict, tolerances: Dict) -> Tuple[bool, str]:
+    """
+    比较两次列画像是否发生实质变化
+
+    参数:
+        old: 上次判断时的info（字典或ColumnProfile）
+        new: 本次的info（字典或ColumnProfile）
+        tolerances: 容差配置
+
+    返回:
+        (是否变化, 变化原因)
+    """
+    old, new = parse_info(old), parse_info(new)
+    if old.get("data_type") != new.get("data_type"):
+        return True, "数据类型变化"
+
+    old_range = old.get("value_range", {})
+    new_range = new.get("value_range", {})
+    if ("range" in old_range) != ("range" in new_range):
+        return True, "空列状态变化"
+
+    null_delta = abs(new_range.get("null_percentage", 0.0) - old_range.get("null_percentage", 0.0))
+    if null_delta > tolerances["null_percentage"]:
+        return True, f"空值比例变化 {null_delta:.2f} 个百分点"
+
+    if "category_values" in old_range or "category_values" in new_range:
+        if old_range.get("category_values") != new_range.get("category_values"):
+            return True, "分类取值变化"
+
+    if "mean" in old_range or "mean" in new_range:
+        scale = _numeric_scale(old_range)
+        old_quantiles = old_range.get("quantiles", {})
+        new_quantiles = new_range.get("quantiles", {})
+        pairs = [(key, old_range.get(key), new_range.get(key)) for key in NUMERIC_KEYS]
+        pairs += [(key, old_quantiles.get(key), new_quantiles.get(key)) for key in QUANTILE_KEYS]
+        for key, old_value, new_value in pairs:
+            if old_value is None and new_value is None:
+                continue
+            if old_value is None or new_value is None:
+                return True, f"{key} 缺失"
+            shift = abs(new_value - old_value) / scale
+            if shift > tolerances["numeric_shift"]:
+                return True, f"{key} 偏移 {shift:.2f} 倍尺度"
+
+        # 出现超出原取值范围的值；范围缩小（如样本画像与全量相比）不影响判断
+        for key, sign in (("min", -1), ("max", 1)):
+            old_value, new_value = old_range.get(key), new_range.get(key)
+            if old_value is None or new_value is None:
+                continue
+            shift = sign * (new_value - old_value) / scale
+            if shift > tolerances["numeric_shift"]:
+                return True, f"{key} 超出原范围 {shift:.2f} 倍尺度"
+
+        # 原本没有离群值的列出现离群值，或离群值比例明显变化
+        old_count, old_share = _outlier_share(old_range)
+        new_count, new_share = _outlier_share(new_range)
+        if old_count == 0 and new_count > 0:
+            return True, f"出现 {new_count} 个离群值"
+        if abs(new_share - old_share) > tolerances["outlier_share"]:
+            return True, f"离群值比例变化 {abs(new_share - old_share):.2f} 个百分点"
+
+    if "min_date" in old_range or "min_date" in new_range:
+        if old_range.get("date_format") != new_range.get("date_format"):
+            return True, "日期格式变化"
+        for key in ("min_date", "max_date"):
+            try:
+                days = abs((datetime.strptime(new_range[key], '%Y-%m-%d')
+                            - datetime.strptime(old_range[key], '%Y-%m-%d')).days)
+            except (KeyError, TypeError, ValueError):
+                return True, f"{key} 无法比较"
+            if days > tolerances["date_shift_days"]:
+                return True, f"{key} 变化 {days} 天"
+
+    if "avg_list_length" in old_range or "avg_list_length" in new_range:
+        old_length = old_range.get("avg_list_length") or 0.0
+        new_length = new_range.get("avg_list_length") or 0.0
+        if abs(new_length - old_length) > tolerances["numeric_shift"] * max(old_length, 1.0):
+            return True, "列表平均长度变化"
+
+    # 标识列出现或消除重复键时需要重新判断
+    old_key = old_range.get("key") or {}
+    new_key = new_range.get("key") or {}
+    if bool(old_key.get("duplicate_rows")) != bool(new_key.get("duplicate_rows")):
+        return True, "主键重复状态变化"
+
+    # 解析失败等标记要求一致
+    for key in EXACT_KEYS:
+        if old_range.get(key) != new_range.get(key):
+            return True, f"{key} 变化"
+
+    return False, "未发生实质变化"
+
+
+class ProfileHistory:
+    """
+    基于SQLite文件的列画像历史存储
+    """
+
+    def __init__(self, history_dir: str, dataset: str, tolerances: Optional[Dict] = None):
+        """
+        初始化并打开（或创建）数据集对应的存储文件
+
+        参数:
+            history_dir: 历史存储目录
+            dataset: 数据集标识
+            tolerances: 容差配置，缺省项使用DEFAULT_TOLERANCES
+        """
+        os.makedirs(history_dir, exist_ok=True)
+        self.tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+        self.path = os.path.join(history_dir, f"{dataset}.sqlite")
+        # 快速预览线程与主线程共用同一连接，操作在锁内串行执行
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS column_profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                column_name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                standard_hash TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                result TEXT NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_column_profiles_column ON column_profiles(column_name, id)")
+        self.conn.commit()
+
+    def latest(self, column_name: str) -> Optional[Dict]:
+        """获取该列最近一次判断的记录"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT standard_hash, profile, result, created_at FROM column_profiles "
+                "WHERE column_name = ? ORDER BY id DESC LIMIT 1",
+                (column_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "standard_hash": row[0],
+            "profile": parse_info(row[1]),
+            "result": json.loads(row[2]),
+            "created_at": row[3],
+        }
+
+    def reusable_result(self, column_name: str, profile: ColumnProfile, standard_hash: str) -> Tuple[Optional[Dict], str]:
+        """
+        若该列画像与上次判断时相比未发生实质变化，返回上次的判断结果
+
+        返回:
+            (可复用的结果或None, 原因)
+        """
+        try:
+            record = self.latest(column_name)
+        except ValueError as e:
+            # 旧版本编码的画像（PROFILE_SCHEMA_VERSION已提升）无法比较，按无历史处理
+            return None, f"历史画像无法解析: {str(e)}"
+        if record is None:
+            return None, "无历史记录"
+        if record["standard_hash"] != standard_hash:
+            return None, "标准已变化"
+        changed, reason = profile_changed(record["profile"], profile, self.tolerances)
+        if changed:
+            return None, reason
+        return record["result"], f"与 {record['created_at']} 的画像相比{reason}"
+
+    def record(self, column_name: str, profile: ColumnProfile, standard_hash: str, result: Dict):
+        """保存一次实际判断的画像（紧凑编码）和结果"""
+        row = (
+            column_name,
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            standard_hash,
+            parse_profile(profile).encode(),
+            json.dumps(result, ensure_ascii=False, default=str),
+        )
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO column_profiles (column_name, created_at, standard_hash, profile, result) "
+                "VALUES (?, ?, ?, ?, ?)",
+                row
+            )
+            self.conn.commit()
+
+    def close(self):
+        """关闭存储"""
+        with self.lock:
+            self.conn.close()
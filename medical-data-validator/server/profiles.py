@@ -0,0 +1,291 @@
+import ast
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Union
+
+"""
+# 列画像的类型化表示
+
+DataFrameChecker 的输出和标准中的 info 原本都是嵌套字典。这里按 data_type 定义带
+`__slots__` 的数据类，宽表的上千列画像常驻内存时不再为每列携带字典的哈希表开销；
+`to_dict()` 得到与原来完全相同的字典结构，用于调用工作流和比较画像。
+
+## 紧凑编码
+
+`encode()` 输出带版本号的紧凑JSON数组，字段按数据类声明顺序位置存放，末尾的空字段省略：
+
+```
+[<版本号>, <data_type>, <real_name或null>, [<value_range字段值>...], <额外字段或null>]
+```
+
+例如 `[2,"int",null,[0,0.0,null,null,1,98,...]]`。用于历史画像存储等需要在进程、缓存之间
+传递画像的场合。解码时版本号不一致会报错；新增字段会改变位置顺序（基类字段排在子类字段之前），必须提升版本号。
+
+`parse_profile()` / `parse_info()` 同时兼容紧凑编码、JSON和旧标准文件中的Python字典字符串
+（`str(dict)` 写出的单引号形式），不再需要替换引号。
+"""
+
+PROFILE_SCHEMA_VERSION = 2
+
+INT_TYPES = ('int', 'integer', 'bigint')
+NUMERIC_TYPES = INT_TYPES + ('float', 'double', 'decimal', 'numeric')
+
+
+@dataclass(slots=True)
+class ValueRange:
+    """所有类型共有的字段；unknown类型只有range="empty" """
+    null_count: Optional[int] = None
+    null_percentage: Optional[float] = None
+    range: Optional[str] = None
+    # 标识列的键统计（keys.analyze_keys的单列结果），非标识列为空
+    key: Optional[Dict[str, Any]] = None
+    # 无法归入已声明字段的键，保证往返不丢信息
+    extra: Optional[Dict[str, Any]] = None
+
+
+@dataclass(slots=True)
+class NumericRange(ValueRange):
+    """int / float"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    std: Optional[float] = None
+    quantiles: Optional[Dict[str, float]] = None
+    histogram: Optional[Dict[str, List]] = None
+    top_values: Optional[List[List]] = None
+    outliers: Optional[Dict[str, Any]] = None
+
+
+@dataclass(slots=True)
+class LabValueRange(NumericRange):
+    """lab_value：数值部分的统计加上比较符和定性结果计数"""
+    numeric_count: Optional[int] = None
+    qualitative_count: Optional[int] = None
+    censored_count: Optional[int] = None
+    comparators: Optional[Dict[str, int]] = None
+    qualitative_values: Optional[List[List]] = None
+
+
+@dataclass(slots=True)
+class TextRange(ValueRange):
+    """text 及其他不提供统计的类型"""
+    description: Optional[str] = None
+
+
+@dataclass(slots=True)
+class CategoryRange(ValueRange):
+    """category_*"""
+    category_values: Optional[Union[List, str]] = None
+    category_count: Optional[int] = None
+
+
+@dataclass(slots=True)
+class DateRange(ValueRange):
+    """date / time"""
+    min_date: Optional[str] = None
+    max_date: Optional[str] = None
+    date_range_days: Optional[int] = None
+    date_format: Optional[str] = None
+    date_info: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ListRange(ValueRange):
+    """list / array / category_list"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    avg_list_length: Optional[float] = None
+    category_values: Optional[Union[List, str]] = None
+    category_count: Optional[int] = None
+
+
+# 各数据类的字段名（不含extra），编码时的位置顺序
+FIELD_NAMES = {
+    cls: tuple(f.name for f in fields(cls) if f.name != 'extra')
+    for cls in (ValueRange, NumericRange, LabValueRange, TextRange, CategoryRange, DateRange, ListRange)
+}
+
+
+def range_class(data_type: str) -> type:
+    """根据data_type选择value_range的数据类，分类规则与rules.RowValidator一致"""
+    data_type = str(data_type or '').lower()
+    if data_type in ('', 'unknown'):
+        return ValueRange
+    if data_type in NUMERIC_TYPES:
+        return NumericRange
+    if data_type == 'lab_value':
+        return LabValueRange
+    if data_type.startswith(('list', 'array', 'category_list')):
+        return ListRange
+    if data_type.startswith('category_'):
+        return CategoryRange
+    if 'date' in data_type or 'time' in data_type:
+        return DateRange
+    return TextRange
+
+
+def make_range(data_type: str, value_range: Optional[Dict]) -> ValueRange:
+    """
+    由value_range字典构造对应的数据类
+
+    异常:
+        ValueError: value_range不是字典（如手工编写的标准中写成了字符串）
+    """
+    if value_range is not None and not isinstance(value_range, dict):
+        raise ValueError(f"value_range应为字典，实际为{type(value_range).__name__}")
+    cls = range_class(data_type)
+    names = FIELD_NAMES[cls]
+    known = {}
+    extra = {}
+    for key, value in (value_range or {}).items():
+        if key in names:
+            known[key] = value
+        else:
+            extra[key] = value
+    return cls(**known, extra=extra or None)
+
+
+def range_to_dict(value_range: ValueRange) -> Dict:
+    """数据类 -> value_range字典，省略值为None的字段"""
+    result = {}
+    for name in FIELD_NAMES[type(value_range)]:
+        value = getattr(value_range, name)
+        if value is not None:
+            result[name] = value
+    if value_range.extra:
+        result.update(value_range.extra)
+    return result
+
+
+@dataclass(slots=True, repr=False)
+class ColumnProfile:
+    """
+    单列画像：data_type + value_range；标准中的画像另有real_name（指标名）
+
+    str()/repr() 输出info字典的Python字典字符串，检查报告直接to_csv保存为标准时
+    与原来的字典形式相同，可以由parse_info读回：
+
+    >>> import io, pandas as pd
+    >>> profile = ColumnProfile('int', make_range('int', {'min': 0, 'max': 98, 'quantiles': {'p50': 41.0}}))
+    >>> buffer = io.StringIO()
+    >>> pd.DataFrame({'column_name': ['age'], 'info': [profile]}).to_csv(buffer, index=False)
+    >>> _ = buffer.seek(0)
+    >>> parse_info(pd.read_csv(buffer)['info'][0]) == profile.to_dict()
+    True
+    """
+    data_type: str
+    value_range: ValueRange
+    real_name: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, info: Dict) -> 'ColumnProfile':
+        """由info字典构造"""
+        data_type = info.get('data_type', '')
+        real_name = info.get('real_name')
+        return cls(data_type, make_range(data_type, info.get('value_range')),
+                   None if real_name is None else str(real_name))
+
+    def to_dict(self) -> Dict:
+        """转为原有的info字典结构"""
+        info = {}
+        if self.real_name is not None:
+            info['real_name'] = self.real_name
+        info['data_type'] = self.data_type
+        info['value_range'] = range_to_dict(self.value_range)
+        return info
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def encode(self) -> str:
+        """带版本号的紧凑JSON编码"""
+        values = [getattr(self.value_range, name) for name in FIELD_NAMES[type(self.value_range)]]
+        while values and values[-1] is None:
+            values.pop()
+        record = [PROFILE_SCHEMA_VERSION, self.data_type, self.real_name, values]
+        if self.value_range.extra:
+            record.append(self.value_range.extra)
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+
+    @classmethod
+    def decode(cls, text: str) -> 'ColumnProfile':
+        """
+        解码encode()的输出
+
+        异常:
+            ValueError: 版本号不一致或格式错误
+        """
+        record = json.loads(text)
+        if not isinstance(record, list) or len(record) < 4:
+            raise ValueError("画像编码格式错误")
+        if record[0] != PROFILE_SCHEMA_VERSION:
+            raise ValueError(f"画像编码版本 {record[0]} 与当前版本 {PROFILE_SCHEMA_VERSION} 不一致")
+        data_type, real_name, values = record[1], record[2], record[3]
+        range_cls = range_class(data_type)
+        extra = record[4] if len(record) > 4 else None
+        value_range = range_cls(**dict(zip(FIELD_NAMES[range_cls], values)), extra=extra)
+        return cls(data_type, value_range, real_name)
+
+
+def parse_profile(info) -> ColumnProfile:
+    """
+    解析任意形式的列画像
+
+    参数:
+        info: ColumnProfile、info字典、紧凑编码、JSON字符串或Python字典字符串
+
+    返回:
+        ColumnProfile
+    """
+    if isinstance(info, ColumnProfile):
+        return info
+    if isinstance(info, dict):
+        return ColumnProfile.from_dict(info)
+    text = str(info).strip()
+    if text.startswith('['):
+        return ColumnProfile.decode(text)
+    return ColumnProfile.from_dict(_parse_text(text))
+
+
+def _parse_text(text: str) -> Dict:
+    """JSON或Python字典字符串 -> info字典"""
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        # 旧标准文件：DataFrame.to_csv写出的str(dict)
+        parsed = ast.literal_eval(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("无法解析的画像")
+    return parsed
+
+
+def parse_info(info) -> Dict:
+    """
+    解析任意形式的列画像并返回info字典
+
+    JSON和字典字符串直接返回解析出的字典，不经过数据类，value_range格式不规范时原样保留
+    """
+    if isinstance(info, dict):
+        return info
+    if isinstance(info, ColumnProfile):
+        return info.to_dict()
+    text = str(info).strip()
+    if text.startswith('['):
+        return ColumnProfile.decode(text).to_dict()
+    return _parse_text(text)
+
+
+def profile_real_name(info) -> Optional[str]:
+    """
+    读取画像中的real_name（指标名），无法解析时返回None
+
+    只需要指标名的场合（表头预检查、结果中的字段含义）使用，标准中某一行格式不规范不影响其他列
+    """
+    try:
+        if isinstance(info, ColumnProfile):
+            return info.real_name
+        real_name = parse_info(info).get('real_name')
+    except (ValueError, SyntaxError, TypeError, RecursionError):
+        return None
+    return None if real_name is None else str(real_name)
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+"""
+# 处理流程的性能剖析
+
+通过 `python process.py ... --profile` 或环境变量 `VALIDATOR_PROFILE=1` 开启，
+关闭时所有钩子都是空操作。开启后在结果文件旁输出：
+
+- `<result>.prof`         cProfile 统计文件，可用 `python -m pstats` 或 snakeviz 查看
+- `<result>.columns.csv`  check_all_columns 中每列的耗时（秒）和峰值内存增量（MB）；
+                          峰值内存由后台线程采样进程RSS得到，不像tracemalloc那样拖慢被测代码
+- `<result>.trace.json`   各阶段和每次API调用的时间线（Chrome Trace Event格式），
+                          可在 chrome://tracing 或 https://ui.perfetto.dev 中打开
+"""
+
+
+def profiling_enabled(argv) -> bool:
+    """根据命令行参数或环境变量判断是否开启性能剖析"""
+    return '--profile' in argv or os.environ.get('VALIDATOR_PROFILE', '') not in ('', '0')
+
+
+class PeakMemorySampler:
+    """
+    后台线程定期读取进程常驻内存（RSS），记录每个区间内相对区间开始时的峰值增量
+
+    不拦截内存分配，对被测代码的耗时几乎没有影响；采样间隔内的短暂峰值可能漏掉。
+    依赖 /proc/self/statm（Linux），其他系统上峰值为None
+    """
+
+    STATM = '/proc/self/statm'
+
+    def __init__(self, interval: float = 0.002):
+        """
+        参数:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.available = os.path.exists(self.STATM)
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if self.available else 0
+        self._fd = None
+        self._baseline = 0
+        self._peak = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _rss(self) -> int:
+        # statm 的第二个字段是常驻页数
+        return int(os.pread(self._fd, 128, 0).split()[1]) * self._page_size
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._peak = max(self._peak, self._rss())
+
+    def start(self):
+        """开始采样"""
+        if not self.available:
+            return
+        self._fd = os.open(self.STATM, os.O_RDONLY)
+        self._stopped.clear()
+        self.reset()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def reset(self):
+        """开始一个新区间"""
+        if self._fd is not None:
+            self._baseline = self._peak = self._rss()
+
+    def peak_mb(self):
+        """当前区间内RSS相对区间开始时的最大增量（MB）"""
+        if self._fd is None:
+            return None
+        peak = max(self._peak, self._rss())
+        return round((peak - self._baseline) / (1024 * 1024), 3)
+
+    def stop(self):
+        """停止采样"""
+        if self._thread:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PipelineProfiler:
+    """
+    处理流程的性能剖析器
+    """
+
+    def __init__(self, output_file: str, enabled: bool):
+        """
+        初始化剖析器
+
+        参数:
+            output_file: 结果文件路径，剖析输出保存在其旁边
+            enabled: 是否开启
+        """
+        self.enabled = enabled
+        self.base = os.path.splitext(output_file)[0]
+        self.events = []
+        self._profile = cProfile.Profile() if enabled else None
+        self._origin = time.perf_counter()
+
+    def start(self):
+        """开始cProfile采集"""
+        if self.enabled:
+            self._profile.enable()
+
+    def stop(self):
+        """停止cProfile采集"""
+        if self.enabled:
+            self._profile.disable()
+
+    def span(self, name: str, **args):
+        """记录一个时间区间；关闭时返回空上下文"""
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+
+    def save(self, column_profile=None):
+        """
+        保存剖析结果
+
+        参数:
+            column_profile: DataFrameChecker.column_profile，每列的耗时和峰值内存
+        """
+        if not self.enabled:
+            return []
+
+        paths = []
+        self._profile.dump_stats(self.base + '.prof')
+        paths.append(self.base + '.prof')
+
+        if column_profile:
+            pd.DataFrame(column_profile).sort_values('wall_time_s', ascending=False).to_csv(
+                self.base + '.columns.csv', index=False)
+            paths.append(self.base + '.columns.csv')
+
+        with open(self.base + '.trace.json', 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        paths.append(self.base + '.trace.json')
+        return paths
+
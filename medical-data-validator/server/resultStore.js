@@ -0,0 +1,158 @@
+const fs = require('fs');
+const path = require('path');
+
+// process.py 在结果CSV旁写入 <result>.jsonl 和 <result>.idx.json
+// 这里按行偏移索引直接读取所需的行，避免每次请求都重新解析整个CSV
+
+const DEFAULT_PAGE_SIZE = 20;
+const MAX_PAGE_SIZE = 200;
+
+// 索引缓存: 索引路径 -> { mtimeMs, index }
+const indexCache = new Map();
+
+function storePaths(resultPath) {
+    const base = resultPath.replace(/\.csv$/, '');
+    return {
+        dataPath: base + '.jsonl',
+        indexPath: base + '.idx.json'
+    };
+}
+
+// 读取（并缓存）行偏移索引，结果未生成索引时返回null
+async function loadIndex(resultPath) {
+    const { dataPath, indexPath } = storePaths(resultPath);
+    let stat;
+    try {
+        stat = await fs.promises.stat(indexPath);
+    } catch (err) {
+        return null;
+    }
+
+    const cached = indexCache.get(indexPath);
+    if (cached && cached.mtimeMs === stat.mtimeMs) {
+        return cached.entry;
+    }
+
+    const index = JSON.parse(await fs.promises.readFile(indexPath, 'utf8'));
+    const entry = { index, dataPath };
+    indexCache.set(indexPath, { mtimeMs: stat.mtimeMs, entry });
+    return entry;
+}
+
+// 按行号读取行；连续的行号合并为一次读取
+async function readRows(dataPath, offsets, rowIds) {
+    if (rowIds.length === 0) {
+        return [];
+    }
+
+    const handle = await fs.promises.open(dataPath, 'r');
+    try {
+        const rows = [];
+        let runStart = 0;
+        for (let i = 1; i <= rowIds.length; i++) {
+            if (i < rowIds.length && rowIds[i] === rowIds[i - 1] + 1) {
+                continue;
+            }
+            const start = offsets[rowIds[runStart]];
+            const end = offsets[rowIds[i - 1] + 1];
+            const buffer = Buffer.alloc(end - start);
+            await handle.read(buffer, 0, buffer.length, start);
+            buffer.toString('utf8').split('\n').forEach((line) => {
+                if (line) {
+                    rows.push(JSON.parse(line));
+                }
+            });
+            runStart = i;
+        }
+        return rows;
+    } finally {
+        await handle.close();
+    }
+}
+
+// 解析分页和过滤参数
+function parseQuery(query) {
+    const page = Math.max(parseInt(query.page, 10) || 0, 0);
+    const pageSize = Math.min(Math.max(parseInt(query.pageSize, 10) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+    const verdict = query.verdict ? String(query.verdict) : null;
+    return { page, pageSize, verdict };
+}
+
+// 定位一页结果；ETag和计数只来自缓存的索引，行内容由readRows()按需读取，
+// 条件请求命中时无需读取结果文件
+async function getPage(resultPath, query) {
+    const entry = await loadIndex(resultPath);
+    if (!entry) {
+        return null;
+    }
+
+    const { index, dataPath } = entry;
+    const { page, pageSize, verdict } = parseQuery(query);
+
+    let total;
+    let rowIds;
+    if (verdict) {
+        const matched = index.verdicts[verdict] || [];
+        total = matched.length;
+        rowIds = matched.slice(page * pageSize, (page + 1) * pageSize);
+    } else {
+        total = index.total;
+        const first = Math.min(page * pageSize, total);
+        const last = Math.min(first + pageSize, total);
+        rowIds = [];
+        for (let i = first; i < last; i++) {
+            rowIds.push(i);
+        }
+    }
+
+    const verdictCounts = {};
+    Object.keys(index.verdicts).forEach((key) => {
+        verdictCounts[key] = index.verdicts[key].length;
+    });
+
+    return {
+        etag: `"${index.etag}"`,
+        body: {
+            total,
+            page,
+            pageSize,
+            verdicts: verdictCounts
+        },
+        readRows: () => readRows(dataPath, index.offsets, rowIds)
+    };
+}
+
+// 通用的Express处理函数: 支持分页、按判断结果过滤以及ETag条件请求
+function createResultHandler(resultsDir) {
+    return async (req, res) => {
+        const filename = path.basename(req.params.filename);
+        const filePath = path.join(resultsDir, filename);
+
+        if (!fs.existsSync(filePath)) {
+            return res.status(404).json({ success: false, error: '文件不存在' });
+        }
+
+        try {
+            const result = await getPage(filePath, req.query);
+            if (!result) {
+                return res.status(404).json({ success: false, error: '结果索引不存在' });
+            }
+
+            // 每次都向服务器确认，未变化时返回304，由浏览器缓存提供内容
+            res.set('ETag', result.etag);
+            res.set('Cache-Control', 'no-cache');
+            if (req.fresh) {
+                return res.status(304).end();
+            }
+            res.json({ ...result.body, rows: await result.readRows() });
+        } catch (err) {
+            console.error('读取结果文件出错:', err);
+            res.status(500).json({ success: false, error: '读取结果文件出错' });
+        }
+    };
+}
+
+module.exports = {
+    getPage,
+    createResultHandler
+};
@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+from profiles import parse_info
+
+"""
+# 行级规则校验
+
+根据标准（process_metric_definition 的输出，即 column_name + info）为每列生成规则，
+以向量化的布尔掩码逐行检查待验证数据。
+
+## 规则
+
+| 规则名              | 适用类型                  | 含义                                   |
+|---------------------|---------------------------|----------------------------------------|
+| not_numeric         | int / float               | 非空但无法解析为数值                   |
+| not_integer         | int                       | 数值带小数                             |
+| out_of_range        | int / float               | 超出标准 [min, max]（仅当 min < max）   |
+| not_in_category     | category_*                | 取值不在 category_values 中            |
+| unparseable_date    | date / time               | 无法按标准的 date_format 解析          |
+| date_out_of_range   | date / time               | 早于 min_date 或晚于 max_date          |
+| malformed_list      | list / array / category_list | 不是 "[a, b, ...]" 形式的数值列表   |
+| list_not_in_category| list[int] / category_list | 列表元素不在 category_values 中        |
+
+## 输出
+
+`validate()` 返回汇总表：column_name, rule, violation_count, violation_percentage, sample_rows。
+`save_violations(path)` 将全部违规以列式 .npz 文件保存：
+`row`（行位置，int64）、`column_code`、`rule_code`（int16），以及对应的 `columns`、`rules` 名称表。
+"""
+
+# 标准中的易读日期格式 -> strptime格式
+DATE_FORMATS = {
+    'YYYY-MM-DD': '%Y-%m-%d',
+    'YYYY-MM-DD HH:MM:SS': '%Y-%m-%d %H:%M:%S',
+    'YYYY/MM/DD HH:MM:SS': '%Y/%m/%d %H:%M:%S',
+    'MM/DD/YYYY': '%m/%d/%Y',
+    'DD.MM.YYYY': '%d.%m.%Y',
+    'DD-MM-YYYY': '%d-%m-%Y',
+    'YYYY年MM月DD日': '%Y年%m月%d日',
+    'HH:MM:SS': '%H:%M:%S',
+}
+
+# "[1, 2.5, -3]" 形式的数值列表
+LIST_PATTERN = r'\[\s*(?:-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\s*(?:,\s*-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\s*)*)?\]'
+
+RULES = [
+    'not_numeric', 'not_integer', 'out_of_range', 'not_in_category',
+    'unparseable_date', 'date_out_of_range', 'malformed_list', 'list_not_in_category',
+]
+
+
+def per_unique(series: pd.Series, func) -> np.ndarray:
+    """
+    对Series的每个不同取值只计算一次func，再按编码映射回每一行
+
+    医疗数据的重复度很高，字符串解析类规则在去重后的取值上计算可大幅减少工作量。
+    func接收去重后的Series，返回同长度的布尔数组；空值行结果为False
+    """
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return np.zeros(len(series), dtype=bool)
+    unique_result = np.append(np.asarray(func(pd.Series(uniques)), dtype=bool), False)
+    # 空值的编码为-1，正好取到末尾追加的False
+    return unique_result[codes]
+
+
+class RowValidator:
+    """
+    按标准逐行校验DataFrame的工具类
+    """
+
+    def __init__(self, df: pd.DataFrame, standard_df: pd.DataFrame, sample_size: int = 10):
+        """
+        初始化RowValidator类
+
+        参数:
+            df: 待验证的DataFrame
+            standard_df: 标准，包含'column_name'和'info'两列
+            sample_size: 每条规则保留的违规行号样例数量
+        """
+        self.df = df
+        self.standard = {
+            row['column_name']: parse_info(row['info'])
+            for _, row in standard_df.iterrows()
+        }
+        self.sample_size = sample_size
+        self.masks = {}
+        self.summary_df = pd.DataFrame(
+            columns=['column_name', 'rule', 'violation_count', 'violation_percentage', 'sample_rows'])
+
+    def _numeric_masks(self, series: pd.Series, data_type: str, value_range: Dict) -> Dict[str, np.ndarray]:
+        """数值列：无法解析、非整数、超出范围"""
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+        present = series.notna().to_numpy()
+        parsed = ~np.isnan(values)
+
+        masks = {'not_numeric': present & ~parsed}
+        if data_type in ('int', 'integer', 'bigint'):
+            masks['not_integer'] = parsed & (np.mod(values, 1) != 0)
+
+        low = value_range.get('min')
+        high = value_range.get('max')
+        if isinstance(low, (int, float)) and isinstance(high, (int, float)) and low < high:
+            masks['out_of_range'] = parsed & ((values < low) | (values > high))
+        return masks
+
+    def _category_masks(self, series: pd.Series, data_type: str, value_range: Dict) -> Dict[str, np.ndarray]:
+        """分类列：取值不在分类列表中"""
+        categories = value_range.get('category_values') or []
+        if not isinstance(categories, list) or not categories:
+            return {}
+
+        if data_type == 'category_int':
+            allowed = pd.to_numeric(pd.Series(categories), errors='coerce').dropna().unique()
+            present = series.notna().to_numpy()
+            inside = pd.to_numeric(series, errors='coerce').isin(allowed).to_numpy()
+            return {'not_in_category': present & ~inside}
+
+        allowed = {str(c).strip() for c in categories}
+        return {'not_in_category': per_unique(
+            series, lambda uniques: ~uniques.astype(str).str.strip().isin(allowed).to_numpy())}
+
+    def _date_masks(self, series: pd.Series, value_range: Dict) -> Dict[str, np.ndarray]:
+        """日期列：无法按格式解析、超出日期范围"""
+        fmt = DATE_FORMATS.get(value_range.get('date_format'), '%Y-%m-%d')
+        codes, uniques = pd.factorize(series)
+        unique_dates = pd.to_datetime(pd.Series(uniques, dtype=object).astype(str).str.strip(), format=fmt, errors='coerce')
+        dates = pd.Series(np.append(unique_dates.to_numpy(), np.datetime64('NaT'))[codes], index=series.index)
+        present = codes >= 0
+        parsed = dates.notna().to_numpy()
+
+        masks = {'unparseable_date': present & ~parsed}
+        bounds = []
+        for key in ('min_date', 'max_date'):
+            try:
+                bounds.append(pd.Timestamp(value_range[key]) if value_range.get(key) else None)
+            except ValueError:
+                bounds.append(None)
+        if bounds[0] is not None or bounds[1] is not None:
+            outside = np.zeros(len(series), dtype=bool)
+            if bounds[0] is not None:
+                outside |= (dates < bounds[0]).to_numpy()
+            if bounds[1] is not None:
+                outside |= (dates > bounds[1]).to_numpy()
+            masks['date_out_of_range'] = parsed & outside
+        return masks
+
+    def _list_masks(self, series: pd.Series, value_range: Dict) -> Dict[str, np.ndarray]:
+        """列表列：格式错误、元素不在分类列表中"""
+        def malformed(uniques):
+            text = uniques.astype(str).str.strip()
+            return ~text.str.fullmatch(LIST_PATTERN).fillna(False).to_numpy(dtype=bool)
+
+        masks = {'malformed_list': per_unique(series, malformed)}
+
+        categories = value_range.get('category_values') or []
+        if isinstance(categories, list) and categories:
+            allowed = pd.to_numeric(pd.Series(categories), errors='coerce').dropna().unique()
+
+            def not_in_category(uniques):
+                # 展开所有元素后一次性比较，再按取值位置聚合
+                text = uniques.astype(str).str.strip()
+                well_formed = text.str.fullmatch(LIST_PATTERN).fillna(False).to_numpy(dtype=bool)
+                elements = text[well_formed].str.strip('[]').str.split(',').explode().str.strip()
+                elements = elements[elements != '']
+                values = pd.to_numeric(elements, errors='coerce')
+                bad_positions = elements.index[~values.isin(allowed).to_numpy()]
+                return np.isin(np.arange(len(uniques)), bad_positions)
+
+            masks['list_not_in_category'] = per_unique(series, not_in_category)
+        return masks
+
+    def _column_masks(self, series: pd.Series, info: Dict) -> Dict[str, np.ndarray]:
+        """根据列的标准类型选择规则"""
+        data_type = str(info.get('data_type', '')).lower()
+        value_range = info.get('value_range')
+        if not isinstance(value_range, dict):
+            value_range = {}
+
+        if data_type in ('int', 'integer', 'bigint', 'float', 'double', 'decimal', 'numeric'):
+            return self._numeric_masks(series, data_type, value_range)
+        if data_type.startswith('list') or data_type.startswith('array') or data_type.startswith('category_list'):
+            return self._list_masks(series, value_range)
+        if data_type.startswith('category_'):
+            return self._category_masks(series, data_type, value_range)
+        if 'date' in data_type or 'time' in data_type:
+            return self._date_masks(series, value_range)
+        return {}
+
+    def validate(self) -> pd.DataFrame:
+        """
+        对标准中存在的每一列执行规则校验
+
+        返回:
+            违规汇总DataFrame
+        """
+        summary = []
+        total_rows = len(self.df)
+        self.masks = {}
+
+        for column, info in self.standard.items():
+            if column not in self.df.columns:
+                continue
+            for rule, mask in self._column_masks(self.df[column], info).items():
+                self.masks[(column, rule)] = mask
+                count = int(np.count_nonzero(mask))
+                sample = self.df.index[np.flatnonzero(mask)[:self.sample_size]]
+                summary.append({
+                    'column_name': column,
+                    'rule': rule,
+                    'violation_count': count,
+                    'violation_percentage': round(count / total_rows * 100, 2) if total_rows else 0.0,
+                    'sample_rows': [x.item() if hasattr(x, 'item') else x for x in sample],
+                })
+
+        self.summary_df = pd.DataFrame(summary, columns=self.summary_df.columns)
+        return self.summary_df
+
+    def save_violations(self, path: str) -> int:
+        """
+        以列式npz文件保存所有违规（行位置、列编码、规则编码）
+
+        返回:
+            违规总数
+        """
+        columns: List[str] = []
+        rows, column_codes, rule_codes = [], [], []
+        for (column, rule), mask in self.masks.items():
+            positions = np.flatnonzero(mask)
+            if positions.size == 0:
+                continue
+            if column not in columns:
+                columns.append(column)
+            rows.append(positions.astype(np.int64))
+            column_codes.append(np.full(positions.size, columns.index(column), dtype=np.int16))
+            rule_codes.append(np.full(positions.size, RULES.index(rule), dtype=np.int16))
+
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        row = concat(rows, np.int64)
+        np.savez_compressed(
+            path,
+            row=row,
+            column_code=concat(column_codes, np.int16),
+            rule_code=concat(rule_codes, np.int16),
+            columns=np.array(columns, dtype=str),
+            rules=np.array(RULES, dtype=str),
+        )
+        return int(row.size)
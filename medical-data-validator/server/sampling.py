@@ -0,0 +1,73 @@
+import time
+import numpy as np
+import pandas as pd
+
+"""
+# 流式读取中的蓄水池抽样
+
+每行分配一个[0, 1)的随机键，始终保留键最小的size行，等价于对已读取的所有行做无放回均匀抽样。
+按分块向量化处理：蓄水池已满时，只有键小于当前最大键的行才可能进入，其余行直接丢弃。
+"""
+
+
+class ReservoirSampler:
+    """
+    分块输入的蓄水池抽样器，达到时间阈值或输入结束时调用一次on_ready(sample_df)
+    """
+
+    def __init__(self, size: int, ready_after: float, on_ready, seed=None):
+        """
+        初始化抽样器
+
+        参数:
+            size: 蓄水池大小（行数）
+            ready_after: 开始读取后经过多少秒即用当前样本触发on_ready
+            on_ready: 回调，参数为样本DataFrame和已读取的行数
+            seed: 随机种子
+        """
+        self.size = size
+        self.ready_after = ready_after
+        self.on_ready = on_ready
+        self.rng = np.random.default_rng(seed)
+        self.sample = None
+        self.keys = np.empty(0)
+        self.seen = 0
+        self.fired = False
+        self.started = time.monotonic()
+
+    def add(self, chunk: pd.DataFrame):
+        """加入一个分块"""
+        keys = self.rng.random(len(chunk))
+        self.seen += len(chunk)
+
+        if self.sample is not None and len(self.sample) >= self.size:
+            # 蓄水池已满，只保留可能进入的行
+            candidates = keys < self.keys.max()
+            chunk = chunk[candidates]
+            keys = keys[candidates]
+
+        if self.sample is None:
+            merged, merged_keys = chunk, keys
+        elif len(chunk):
+            merged = pd.concat([self.sample, chunk])
+            merged_keys = np.concatenate([self.keys, keys])
+        else:
+            merged, merged_keys = self.sample, self.keys
+
+        if len(merged) > self.size:
+            keep = np.sort(np.argpartition(merged_keys, self.size - 1)[:self.size])
+            merged = merged.iloc[keep]
+            merged_keys = merged_keys[keep]
+        self.sample, self.keys = merged, merged_keys
+
+        if not self.fired and time.monotonic() - self.started >= self.ready_after:
+            self._fire()
+
+    def finish(self):
+        """输入结束；若尚未触发则用最终样本触发"""
+        if not self.fired and self.sample is not None:
+            self._fire()
+
+    def _fire(self):
+        self.fired = True
+        self.on_ready(self.sample.reset_index(drop=True), self.seen)
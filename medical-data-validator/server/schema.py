@@ -0,0 +1,250 @@
+import io
+import csv
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from profiles import profile_real_name
+
+"""
+# 表头预检查
+
+在加载和画像之前，只读取待验证数据的表头（CSV第一行、Arrow的schema），
+与标准中的列名建立对应关系：
+
+1. 精确匹配：列名与标准 column_name 完全相同
+2. 规范化匹配：忽略大小写、全角/半角、首尾空白以及空格/下划线/连字符差异，
+   同时匹配标准中的 real_name（字段含义）
+3. 模糊匹配：用字符二元组倒排索引找出候选，再以相似度打分，超过阈值才接受；
+   多个表头争抢同一标准列时按得分从高到低一对一分配
+
+能匹配的表头比例低于阈值时直接失败，否则把改名/大小写变体的列重命名为标准列名。
+"""
+
+# 连续的空白、下划线、连字符等分隔符视为同一分隔
+SEPARATORS = re.compile(r'[\s_\-\.]+')
+
+
+def normalize_name(name) -> str:
+    """列名规范化：全角转半角、小写、统一分隔符"""
+    text = unicodedata.normalize('NFKC', str(name)).strip().lower()
+    return SEPARATORS.sub('_', text).strip('_')
+
+
+def bigrams(text: str) -> List[str]:
+    """字符二元组；单字符名称返回其本身"""
+    if len(text) < 2:
+        return [text] if text else []
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def read_csv_header(source) -> List[str]:
+    """
+    读取CSV第一行
+
+    参数:
+        source: 文件路径，或二进制流（读取后流停在第二行开头）
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            line = f.readline()
+    else:
+        line = source.readline()
+    text = line.decode('utf-8-sig', errors='replace')
+    return next(csv.reader([text]), [])
+
+
+def read_arrow_header(file_path: str, stream: bool = False) -> List[str]:
+    """只读取Arrow文件的schema，不读取数据"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("读取Arrow文件需要安装pyarrow")
+
+    with pa.memory_map(file_path, 'r') as source:
+        reader = pa.ipc.open_stream(source) if stream else pa.ipc.open_file(source)
+        return list(reader.schema.names)
+
+
+class PrefixedStream(io.RawIOBase):
+    """
+    先返回已读出的表头行，再继续读取原始流
+
+    用于stdin：预检查读走第一行后，仍把完整内容交给pd.read_csv
+    """
+
+    def __init__(self, prefix: bytes, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size] = self.prefix[:size]
+            self.prefix = self.prefix[size:]
+            return size
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+
+class ColumnIndex:
+    """
+    标准列名索引：精确、规范化和基于二元组倒排的模糊查找
+    """
+
+    def __init__(self, standard_df: pd.DataFrame, fuzzy_cutoff: float = 0.8):
+        """
+        初始化索引
+
+        参数:
+            standard_df: 标准，包含'column_name'和'info'两列
+            fuzzy_cutoff: 模糊匹配的最低相似度（0-1）
+        """
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.columns = [str(name) for name in standard_df['column_name']]
+        self.exact = set(self.columns)
+        # 规范化名称 -> 标准列名；column_name 优先于 real_name
+        self.normalized: Dict[str, str] = {}
+        for _, row in standard_df.iterrows():
+            real_name = profile_real_name(row['info'])
+            if real_name:
+                self.normalized.setdefault(normalize_name(real_name), str(row['column_name']))
+        for name in self.columns:
+            self.normalized[normalize_name(name)] = name
+        # 二元组 -> 规范化名称
+        self.postings = defaultdict(set)
+        for key in self.normalized:
+            for gram in bigrams(key):
+                self.postings[gram].add(key)
+
+    def candidates(self, header: str, limit: int = 5) -> List[tuple]:
+        """
+        模糊查找候选标准列
+
+        返回:
+            [(相似度, 标准列名)]，按相似度降序，只含超过阈值的候选
+        """
+        key = normalize_name(header)
+        grams = bigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for name in self.postings.get(gram, ()):
+                shared[name] += 1
+        # 共享二元组最多的若干个再精确打分
+        shortlist = sorted(shared, key=shared.get, reverse=True)[:limit * 4]
+        scored = {}
+        for name in shortlist:
+            score = SequenceMatcher(None, key, name).ratio()
+            column = self.normalized[name]
+            if score >= self.fuzzy_cutoff and score > scored.get(column, 0):
+                scored[column] = score
+        return sorted(((score, column) for column, score in scored.items()), reverse=True)[:limit]
+
+    def match(self, headers: List[str]) -> Dict:
+        """
+        将表头与标准列名对应
+
+        返回:
+            字典，包含：
+            - exact: 与标准列名完全一致的表头
+            - rename: {表头: 标准列名}，规范化或模糊匹配得到
+            - unmatched: 无法对应的表头
+            - missing: 没有任何表头对应的标准列
+            - duplicated: 规范化后对应到已被占用的标准列的表头
+        """
+        taken = {}
+        exact, unmatched, duplicated = [], [], []
+        rename = {}
+
+        for header in headers:
+            if header in self.exact and header not in taken:
+                taken[header] = header
+                exact.append(header)
+
+        pending = []
+        for header in headers:
+            if header in exact:
+                continue
+            column = self.normalized.get(normalize_name(header))
+            if column is None:
+                pending.append(header)
+            elif column in taken:
+                duplicated.append(header)
+            else:
+                taken[column] = header
+                rename[header] = column
+
+        # 模糊匹配按得分从高到低一对一分配
+        proposals = []
+        for header in pending:
+            for score, column in self.candidates(header):
+                proposals.append((score, header, column))
+        assigned = set()
+        for score, header, column in sorted(proposals, key=lambda p: p[0], reverse=True):
+            if header in assigned or column in taken:
+                continue
+            taken[column] = header
+            rename[header] = column
+            assigned.add(header)
+        unmatched = [header for header in pending if header not in assigned]
+
+        return {
+            'exact': exact,
+            'rename': rename,
+            'unmatched': unmatched,
+            'missing': [column for column in self.columns if column not in taken],
+            'duplicated': duplicated,
+        }
+
+
+def check_headers(headers: List[str], standard_df: pd.DataFrame,
+                  fuzzy_cutoff: float = 0.8, min_match: float = 0.5) -> Dict:
+    """
+    表头预检查
+
+    参数:
+        headers: 待验证数据的表头
+        standard_df: 标准
+        fuzzy_cutoff: 模糊匹配的最低相似度
+        min_match: 能对应到标准的表头最低比例，低于该比例视为上传了错误的文件
+
+    返回:
+        match() 的结果
+
+    异常:
+        ValueError: 表头为空、没有任何列能对应到标准或匹配比例过低
+    """
+    if not headers:
+        raise ValueError("待验证数据没有表头")
+
+    result = ColumnIndex(standard_df, fuzzy_cutoff).match(headers)
+    matched = len(result['exact']) + len(result['rename'])
+    ratio = matched / len(headers)
+    if matched == 0 or ratio < min_match:
+        preview = ', '.join(result['unmatched'][:10])
+        raise ValueError(
+            f"表头与标准不匹配：{len(headers)} 列中仅 {matched} 列能对应到标准"
+            f"（{ratio:.0%}，要求至少 {min_match:.0%}）；无法对应的列: {preview}")
+    return result
+
+
+def header_source(file_path: str, file_format: Optional[str]):
+    """
+    只读取表头的方式；pickle/joblib必须整体反序列化，无法只读表头，返回None
+    """
+    if file_path.endswith('.csv'):
+        return lambda: read_csv_header(file_path)
+    if file_format == 'arrow':
+        return lambda: read_arrow_header(file_path)
+    if file_format == 'arrow_stream':
+        return lambda: read_arrow_header(file_path, stream=True)
+    return None
@@ -1,11 +1,12 @@
 const express = require('express');
-const multer = require('multer');
+const Busboy = require('busboy');
 const path = require('path');
 const cors = require('cors');
 const WebSocket = require('ws');
 const http = require('http');
 const fs = require('fs');
 const { spawn } = require('child_process');
+const { createResultHandler } = require('./resultStore');
 
 const app = express();
 const server = http.createServer(app);
@@ -16,22 +17,6 @@ const wss = new WebSocket.Server({
     perMessageDeflate: false
 });
 
-// 配置文件上传
-const storage = multer.diskStorage({
-    destination: function (req, file, cb) {
-        const uploadDir = path.join(__dirname, 'uploads');
-        if (!fs.existsSync(uploadDir)) {
-            fs.mkdirSync(uploadDir, { recursive: true });
-        }
-        cb(null, uploadDir);
-    },
-    filename: function (req, file, cb) {
-        cb(null, Date.now() + '-' + file.originalname);
-    }
-});
-
-const upload = multer({ storage: storage });
-
 // 中间件
 app.use(cors());
 app.use(express.json());
@@ -63,106 +48,270 @@ wss.on('connection', (ws) => {
     });
 });
 
-// 文件上传处理
-app.post('/api/upload', upload.fields([
-    { name: 'standard', maxCount: 1 },
-    { name: 'validation', maxCount: 1 }
-]), async (req, res) => {
-    try {
-        if (!req.files || !req.files.standard || !req.files.validation) {
-            return res.status(400).json({ error: '请上传标准数据和待验证数据文件' });
-        }
+// 正在运行的任务: jobId -> Python子进程
+const jobs = new Map();
 
-        const standardFile = req.files.standard[0];
-        const validationFile = req.files.validation[0];
+// 取消宽限期，超时仍未退出则强制结束（毫秒）
+const CANCEL_GRACE_MS = 5000;
 
-        // 验证文件类型
-        if (!standardFile.originalname.endsWith('.csv')) {
-            return res.status(400).json({ error: '标准数据必须是CSV文件' });
+// 终止任务的Python进程：先SIGTERM让其正常退出，宽限期后仍在运行则SIGKILL
+function cancelJob(jobId) {
+    const pythonProcess = jobs.get(jobId);
+    if (!pythonProcess) {
+        return false;
+    }
+    pythonProcess.cancelled = true;
+    pythonProcess.kill('SIGTERM');
+    setTimeout(() => {
+        if (pythonProcess.exitCode === null && pythonProcess.signalCode === null) {
+            pythonProcess.kill('SIGKILL');
         }
+    }, CANCEL_GRACE_MS).unref();
+    return true;
+}
 
-        if (!validationFile.originalname.endsWith('.csv') && !validationFile.originalname.endsWith('.pkl')) {
-            return res.status(400).json({ error: '待验证数据必须是CSV或PKL文件' });
-        }
+// 启动Python处理脚本，并将进度和错误转发给WebSocket客户端
+function startPython(args, res, resultName, jobId) {
+    const pythonProcess = spawn('python', ['process.py', ...args]);
+    jobs.set(jobId, pythonProcess);
 
-        // 创建结果目录
-        const resultsDir = path.join(__dirname, 'results');
-        if (!fs.existsSync(resultsDir)) {
-            fs.mkdirSync(resultsDir, { recursive: true });
-        }
+    let errorOutput = '';
+    let stdoutOutput = '';
+
+    // 向所有连接的客户端广播消息
+    const broadcast = (payload) => {
+        wss.clients.forEach((client) => {
+            if (client.readyState === WebSocket.OPEN) {
+                client.send(JSON.stringify(payload));
+            }
+        });
+    };
+
+    // 处理Python脚本的输出；一次data事件可能包含多行或半行，按行缓冲后解析
+    let pending = '';
+    pythonProcess.stdout.on('data', (data) => {
+        const text = pending + data.toString();
+        const lines = text.split('\n');
+        pending = lines.pop();
+        stdoutOutput += data.toString();
 
-        // 生成结果文件名
-        const timestamp = Date.now();
-        const resultFile = path.join(resultsDir, `result_${timestamp}.csv`);
-
-        // 启动Python处理脚本
-        const pythonProcess = spawn('python', [
-            'process.py',
-            standardFile.path,
-            validationFile.path,
-            resultFile
-        ]);
-
-        let errorOutput = '';
-        let stdoutOutput = '';
-
-        // 处理Python脚本的输出
-        pythonProcess.stdout.on('data', (data) => {
-            const message = data.toString().trim();
-            stdoutOutput += message + '\n';
+        lines.map((line) => line.trim()).filter(Boolean).forEach((message) => {
             console.log('Python stdout:', message);
-            
+
             if (message.startsWith('PROGRESS:')) {
-                const progress = message.split(':')[1];
                 // 广播进度到所有连接的客户端
-                wss.clients.forEach((client) => {
-                    if (client.readyState === WebSocket.OPEN) {
-                        client.send(JSON.stringify({
-                            type: 'progress',
-                            progress: parseFloat(progress)
-                        }));
-                    }
+                broadcast({
+                    type: 'progress',
+                    progress: parseFloat(message.slice('PROGRESS:'.length))
+                });
+            } else if (message.startsWith('PROVISIONAL:')) {
+                // 基于样本的初步结果已生成，可通过 /api/result 分页读取
+                broadcast({
+                    type: 'provisional',
+                    jobId,
+                    resultFile: message.slice('PROVISIONAL:'.length)
                 });
             }
         });
+    });
 
-        pythonProcess.stderr.on('data', (data) => {
-            const error = data.toString().trim();
-            errorOutput += error + '\n';
-            console.error('Python stderr:', error);
-            
-            // 发送错误信息到客户端
-            wss.clients.forEach((client) => {
-                if (client.readyState === WebSocket.OPEN) {
-                    client.send(JSON.stringify({
-                        type: 'error',
-                        message: error
-                    }));
-                }
-            });
+    pythonProcess.stderr.on('data', (data) => {
+        const error = data.toString().trim();
+        errorOutput += error + '\n';
+        console.error('Python stderr:', error);
+        
+        // 发送错误信息到客户端
+        broadcast({
+            type: 'error',
+            message: error
         });
+    });
+
+    // Python提前退出时stdin可能已关闭，忽略EPIPE
+    pythonProcess.stdin.on('error', (error) => {
+        console.error('Python stdin error:', error.message);
+    });
+
+    pythonProcess.on('close', (code) => {
+        jobs.delete(jobId);
+        console.log(`Python process exited with code ${code}`);
+        console.log('Python stdout:', stdoutOutput);
+        console.log('Python stderr:', errorOutput);
+
+        if (res.headersSent) {
+            return;
+        }
+        if (pythonProcess.cancelled) {
+            res.status(409).json({ error: '任务已取消' });
+        } else if (code === 0) {
+            res.json({
+                success: true,
+                resultFile: resultName
+            });
+        } else {
+            res.status(500).json({
+                error: '处理文件时出错',
+                details: errorOutput || stdoutOutput
+            });
+        }
+    });
+
+    return pythonProcess;
+}
+
+// 将上传流写入磁盘，写完后resolve
+function saveStream(stream, filePath) {
+    const fileStream = fs.createWriteStream(filePath);
+    stream.pipe(fileStream);
+    return new Promise((resolve, reject) => {
+        fileStream.on('finish', resolve);
+        fileStream.on('error', reject);
+    });
+}
+
+// 待验证数据支持的扩展名；非CSV文件由process.py根据文件头识别格式
+const VALIDATION_EXTENSIONS = ['.csv', '.pkl', '.joblib', '.arrow', '.feather'];
+
+// 文件上传处理
+// 标准数据（客户端先发送）写入磁盘后立即启动Python；待验证的CSV一边保存到uploads/留档，
+// 一边通过stdin流式交给Python解析，上传和解析重叠进行。
+// 若待验证数据先于标准数据到达或不是CSV文件，则等全部写盘后再按文件路径处理。
+app.post('/api/upload', (req, res) => {
+    let busboy;
+    try {
+        busboy = Busboy({ headers: req.headers });
+    } catch (error) {
+        return res.status(400).json({ error: '文件上传失败', details: error.message });
+    }
+
+    const uploadDir = path.join(__dirname, 'uploads');
+    if (!fs.existsSync(uploadDir)) {
+        fs.mkdirSync(uploadDir, { recursive: true });
+    }
+
+    // 创建结果目录
+    const resultsDir = path.join(__dirname, 'results');
+    if (!fs.existsSync(resultsDir)) {
+        fs.mkdirSync(resultsDir, { recursive: true });
+    }
+
+    // 生成结果文件名；jobId由客户端提供，用于取消任务
+    const timestamp = Date.now();
+    const jobId = String(req.query.jobId || timestamp);
+    const resultName = `result_${timestamp}.csv`;
+    const resultFile = path.join(resultsDir, resultName);
+    // quickLook=1 时先返回基于样本的初步结果
+    const options = req.query.quickLook === '1' ? ['--quick-look'] : [];
 
-        pythonProcess.on('close', (code) => {
-            console.log(`Python process exited with code ${code}`);
-            console.log('Python stdout:', stdoutOutput);
-            console.log('Python stderr:', errorOutput);
+    let standardPath = null;
+    let standardSaved = null;
+    let validationPath = null;
+    let datasetArgs = [];
+    let pythonProcess = null;
+    let failed = false;
+    const writes = [];
 
-            if (code === 0) {
-                res.json({
-                    success: true,
-                    resultFile: `result_${timestamp}.csv`
+    const fail = (status, error, details) => {
+        if (failed) {
+            return;
+        }
+        failed = true;
+        req.unpipe(busboy);
+        req.resume();
+        if (pythonProcess) {
+            cancelJob(jobId);
+        }
+        if (!res.headersSent) {
+            res.status(status).json({ error, details });
+        }
+    };
+
+    busboy.on('file', (name, stream, info) => {
+        const filename = path.basename(info.filename || '');
+        if (failed) {
+            stream.resume();
+            return;
+        }
+
+        if (name === 'standard') {
+            // 验证文件类型
+            if (!filename.endsWith('.csv')) {
+                stream.resume();
+                return fail(400, '标准数据必须是CSV文件');
+            }
+            standardPath = path.join(uploadDir, `${timestamp}-${filename}`);
+            standardSaved = saveStream(stream, standardPath);
+            writes.push(standardSaved);
+        } else if (name === 'validation') {
+            if (!VALIDATION_EXTENSIONS.some((ext) => filename.endsWith(ext))) {
+                stream.resume();
+                return fail(400, '待验证数据必须是CSV、PKL、Joblib或Arrow文件');
+            }
+            validationPath = path.join(uploadDir, `${timestamp}-${filename}`);
+            // 历史画像按数据集区分：客户端给出的dataset，否则为上传时的文件名（不含扩展名）
+            datasetArgs = [`--dataset=${req.query.dataset || filename.split('.')[0]}`];
+
+            if (standardSaved && filename.endsWith('.csv')) {
+                // 在标准数据落盘前不消费该流，保证Python收到完整的字节序列
+                const streamed = standardSaved.then(() => {
+                    if (failed) {
+                        stream.resume();
+                        return;
+                    }
+                    pythonProcess = startPython([standardPath, '-', resultFile, ...options, ...datasetArgs], res, resultName, jobId);
+                    stream.pipe(pythonProcess.stdin);
+                    return saveStream(stream, validationPath);
                 });
+                writes.push(streamed);
             } else {
-                res.status(500).json({
-                    error: '处理文件时出错',
-                    details: errorOutput || stdoutOutput
-                });
+                writes.push(saveStream(stream, validationPath));
             }
-        });
+        } else {
+            stream.resume();
+        }
+    });
 
-    } catch (error) {
+    busboy.on('close', async () => {
+        if (failed) {
+            return;
+        }
+        if (!standardPath || !validationPath) {
+            return fail(400, '请上传标准数据和待验证数据文件');
+        }
+        try {
+            await Promise.all(writes);
+        } catch (error) {
+            console.error('Upload error:', error);
+            return fail(500, '文件上传失败', error.message);
+        }
+        if (!pythonProcess && !failed) {
+            pythonProcess = startPython([standardPath, validationPath, resultFile, ...options, ...datasetArgs], res, resultName, jobId);
+        }
+    });
+
+    busboy.on('error', (error) => {
         console.error('Upload error:', error);
-        res.status(500).json({ error: '文件上传失败', details: error.message });
+        fail(500, '文件上传失败', error.message);
+    });
+
+    // 客户端中途断开（如关闭页面）时停止处理
+    req.on('aborted', () => fail(499, '上传已中断'));
+    res.on('close', () => {
+        if (!res.writableFinished) {
+            failed = true;
+            cancelJob(jobId);
+        }
+    });
+
+    req.pipe(busboy);
+});
+
+// 取消正在运行的任务
+app.post('/api/cancel/:jobId', (req, res) => {
+    if (cancelJob(req.params.jobId)) {
+        res.json({ success: true });
+    } else {
+        res.status(404).json({ error: '任务不存在或已结束' });
     }
 });
 
@@ -178,6 +327,9 @@ app.get('/api/download/:filename', (req, res) => {
     }
 });
 
+// 获取结果数据（分页、按判断结果过滤、支持ETag）
+app.get('/api/result/:filename', createResultHandler(path.join(__dirname, 'results')));
+
 // 启动服务器
 const PORT = process.env.PORT || 3001;
 server.listen(PORT, () => {